@@ -0,0 +1,49 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from core.testing import query_budget as _query_budget
+from posts import counters
+from posts.models import Comment, Follow, Post
+
+DATASET_POSTS = 2000
+DATASET_USERS = 50
+DATASET_COMMENTS = 500
+
+
+@pytest.fixture
+def query_budget():
+    """Контекстный менеджер и декоратор бюджета SQL-запросов."""
+    return _query_budget
+
+
+@pytest.fixture
+def large_dataset(user, another_user, group):
+    """Несколько тысяч постов, подписки и комментарии."""
+    User = get_user_model()
+    User.objects.bulk_create([
+        User(username=f'author_{number}')
+        for number in range(DATASET_USERS)
+    ])
+    authors = list(User.objects.filter(username__startswith='author_'))
+    authors += [user, another_user]
+    Post.objects.bulk_create([
+        Post(
+            text=f'Пост номер {number}',
+            author=authors[number % len(authors)],
+            group=group if number % 2 else None,
+        )
+        for number in range(DATASET_POSTS)
+    ], batch_size=500)
+    Follow.objects.create(user=user, author=another_user)
+    for author in authors[:10]:
+        Follow.objects.create(user=user, author=author)
+    post = Post.objects.filter(author=user).first()
+    Comment.objects.bulk_create([
+        Comment(post=post, author=authors[number % len(authors)],
+                text=f'Комментарий {number}')
+        for number in range(DATASET_COMMENTS)
+    ], batch_size=500)
+    counters.reconcile()
+    cache.clear()
+    return post
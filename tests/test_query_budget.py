@@ -0,0 +1,106 @@
+import pytest
+from django.test import Client
+from django.urls import reverse
+
+pytestmark = [pytest.mark.django_db]
+
+# Имя URL, аргументы, бюджет запросов для гостя и для пользователя.
+# None у гостя — страница требует авторизации и отвечает редиректом.
+PAGE_BUDGETS = [
+    ('posts:index', (), {}, 3, 5),
+    ('posts:index', (), {'page': 200}, 4, 6),
+    ('posts:group_list', ('test-link',), {}, 4, 6),
+    ('posts:group_list', ('test-link',), {'page': 100}, 5, 7),
+    ('posts:profile', ('TestUser',), {}, 5, 9),
+    ('posts:profile', ('TestUser',), {'page': 5}, 6, 10),
+    ('posts:post_detail', ('POST',), {}, 6, 8),
+    ('posts:post_detail', ('POST',), {'page': 10}, 6, 8),
+    ('posts:post_create', (), {}, None, 3),
+    ('posts:post_edit', ('POST',), {}, None, 5),
+    ('posts:follow_index', (), {}, None, 6),
+    ('posts:follow_index', (), {'page': 3}, None, 6),
+    ('posts:search', (), {'q': 'Тестовый'}, 3, 5),
+    ('users:signup', (), {}, 0, 2),
+    ('users:login', (), {}, 0, 2),
+    ('users:password_change', (), {}, None, 2),
+    ('users:password_change_done', (), {}, None, 2),
+    ('users:password_reset', (), {}, 0, 2),
+    ('users:password_reset_success', (), {}, 0, 2),
+    ('users:password_reset_confirm', ('MQ', 'bad-token'), {}, 1, 3),
+    ('users:password_reset_complete', (), {}, 0, 2),
+    ('about:author', (), {}, 0, 2),
+    ('about:tech', (), {}, 0, 2),
+]
+
+# Страницы лент, которые при повторном запросе отдаются из кэша.
+CACHED_PAGES = [
+    ('posts:index', ()),
+    ('posts:group_list', ('test-link',)),
+]
+
+
+def build_url(name, args, params, post):
+    args = [post.id if arg == 'POST' else arg for arg in args]
+    url = reverse(name, args=args)
+    if params:
+        url += '?' + '&'.join(f'{key}={value}' for key, value in params.items())
+    return url
+
+
+class TestQueryBudget:
+
+    @pytest.mark.parametrize('name,args,params,guest_budget,user_budget', PAGE_BUDGETS)
+    def test_guest_page_budget(self, client, large_dataset, query_budget,
+                               name, args, params, guest_budget, user_budget):
+        url = build_url(name, args, params, large_dataset)
+        if guest_budget is None:
+            guest_budget = 0
+        with query_budget(guest_budget):
+            response = client.get(url)
+        assert response.status_code in (200, 302), (
+            f'Страница `{url}` работает неправильно'
+        )
+
+    @pytest.mark.parametrize('name,args,params,guest_budget,user_budget', PAGE_BUDGETS)
+    def test_user_page_budget(self, user_client, large_dataset, query_budget,
+                              name, args, params, guest_budget, user_budget):
+        url = build_url(name, args, params, large_dataset)
+        with query_budget(user_budget):
+            response = user_client.get(url)
+        assert response.status_code == 200, (
+            f'Страница `{url}` работает неправильно'
+        )
+
+    @pytest.mark.parametrize('name,args', CACHED_PAGES)
+    def test_cached_feed_page(self, user_client, large_dataset,
+                              query_budget, name, args):
+        url = reverse(name, args=args)
+        guest_client = Client()
+        guest_client.get(url)
+        with query_budget(0):
+            guest_client.get(url)
+        user_client.get(url)
+        with query_budget(2):
+            user_client.get(url)
+
+    def test_feed_cache_dropped_after_new_post(self, client, user, large_dataset):
+        url = reverse('posts:index')
+        client.get(url)
+        user.posts.create(text='Новый пост в ленте')
+        response = client.get(url)
+        assert 'Новый пост в ленте' in response.content.decode(), (
+            'Проверьте, что новый пост сбрасывает кэш ленты'
+        )
+
+    def test_write_budget(self, user_client, another_user, large_dataset, query_budget):
+        with query_budget(8):
+            user_client.post(
+                reverse('posts:add_comment', args=(large_dataset.id,)),
+                data={'text': 'Комментарий'},
+            )
+        with query_budget(10):
+            user_client.get(reverse('posts:profile_unfollow', args=(another_user.username,)))
+        with query_budget(12):
+            user_client.get(reverse('posts:profile_follow', args=(another_user.username,)))
+        with query_budget(14):
+            user_client.post(reverse('posts:post_create'), data={'text': 'Пост'})
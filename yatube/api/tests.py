@@ -0,0 +1,94 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.author,
+                 group=cls.group if i % 2 else None)
+            for i in range(15)
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cursor_pages_cover_feed(self):
+        url = reverse('api:posts')
+        ids = []
+        while url:
+            response = self.client.get(url, {'limit': 4} if not ids else None)
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            data = response.json()
+            ids += [post['id'] for post in data['results']]
+            url = data['next']
+        self.assertEqual(
+            ids, list(Post.objects.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True)))
+
+    def test_sparse_fields(self):
+        response = self.client.get(
+            reverse('api:group_posts', args=[self.group.slug]),
+            {'fields': 'id,group'})
+        results = response.json()['results']
+        self.assertEqual(len(results), 7)
+        self.assertEqual(set(results[0]), {'id', 'group'})
+        self.assertEqual(results[0]['group'], 'group')
+
+    def test_bad_requests(self):
+        cases = {
+            reverse('api:posts') + '?fields=password': HTTPStatus.BAD_REQUEST,
+            reverse('api:posts') + '?limit=x': HTTPStatus.BAD_REQUEST,
+            reverse('api:group_posts', args=['nope']): HTTPStatus.NOT_FOUND,
+            reverse('api:profile_posts', args=['nope']): HTTPStatus.NOT_FOUND,
+            reverse('api:follow'): HTTPStatus.UNAUTHORIZED,
+        }
+        for url, status in cases.items():
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, status)
+
+    def test_not_modified(self):
+        url = reverse('api:profile_posts', args=[self.author.username])
+        response = self.client.get(url)
+        with self.assertNumQueries(2):
+            cached = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, HTTPStatus.NOT_MODIFIED)
+        cached = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(cached.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_etag_changes_with_feed(self):
+        url = reverse('api:posts')
+        etag = self.client.get(url)['ETag']
+        post = Post.objects.first()
+        post.text = 'Исправленный текст'
+        post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_follow_feed_is_private(self):
+        self.client.force_login(self.reader)
+        response = self.client.get(reverse('api:follow'))
+        self.assertEqual(len(response.json()['results']), 10)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+        etag = response['ETag']
+        Follow.objects.filter(user=self.reader).delete()
+        response = self.client.get(
+            reverse('api:follow'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.json()['results'], [])
@@ -0,0 +1,168 @@
+import hashlib
+from calendar import timegm
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.http import JsonResponse
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers,
+)
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+from core.routers import replica_reads
+from posts.caching import (INDEX_FEED, author_feed, get_feed_version,
+                           group_feed)
+from posts.models import Follow, Group, User
+from posts.paginators import CursorPaginator
+from posts.views import (
+    COUNT_POSTS, get_follow_paginator, get_group_posts, get_index_posts,
+    get_profile_posts,
+)
+
+FIELDS = {
+    'id': lambda post: post.pk,
+    'text': lambda post: post.text,
+    'pub_date': lambda post: post.pub_date.isoformat(),
+    'author': lambda post: post.author.username,
+    'group': lambda post: post.group.slug if post.group_id else None,
+    'image': lambda post: post.image.url if post.image else None,
+}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def error(detail, status):
+    return JsonResponse(
+        {'detail': detail}, status=status,
+        json_dumps_params={'ensure_ascii': False})
+
+
+def get_fields(request):
+    """Поля из ?fields=id,text; без параметра — все."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(FIELDS)
+    fields = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in FIELDS]
+    if unknown or not fields:
+        raise BadRequest(
+            f'Неизвестные поля: {", ".join(unknown)}. '
+            f'Доступны: {", ".join(FIELDS)}.')
+    return fields
+
+
+def get_limit(request):
+    raw = request.GET.get('limit')
+    if raw is None:
+        return COUNT_POSTS
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise BadRequest('limit должен быть числом')
+    return max(1, min(limit, settings.API_MAX_LIMIT))
+
+
+def page_link(request, **params):
+    query = request.GET.copy()
+    query.pop('after', None)
+    query.pop('before', None)
+    for key, value in params.items():
+        query[key] = value
+    return request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+
+
+def serialize_page(request, paginator, fields):
+    page = paginator.get_cursor_page(
+        after=request.GET.get('after'), before=request.GET.get('before'))
+    return {
+        'results': [
+            {name: FIELDS[name](post) for name in fields}
+            for post in page
+        ],
+        'next': (page_link(request, after=page.next_cursor)
+                 if page.has_next() else None),
+        'previous': (page_link(request, before=page.previous_cursor)
+                     if page.has_previous() else None),
+    }
+
+
+def feed_response(request, make_paginator, private=False, state='',
+                  feed=INDEX_FEED):
+    """JSON-страница ленты с ETag и Last-Modified.
+
+    Валидаторы считаются по самой свежей pub_date ленты и поколению
+    кэша ленты feed (оно меняется при правке и удалении постов), так что
+    на повторный запрос с If-None-Match или If-Modified-Since
+    отдаётся 304 без выборки и сериализации страницы.
+    make_paginator(limit) возвращает курсорный пагинатор ленты.
+    """
+    try:
+        fields = get_fields(request)
+        limit = get_limit(request)
+    except BadRequest as exc:
+        return error(str(exc), 400)
+    paginator = make_paginator(limit)
+    latest = paginator.latest()
+    etag = quote_etag(hashlib.md5(
+        f'{get_feed_version(feed)}:{latest}:{state}'.encode()).hexdigest())
+    last_modified = timegm(latest.utctimetuple()) if latest else None
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = JsonResponse(
+            serialize_page(request, paginator, fields),
+            json_dumps_params={'ensure_ascii': False})
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(
+        response, no_cache=True, **{'private' if private else 'public': True})
+    if private:
+        patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+@require_safe
+@replica_reads
+def posts(request):
+    return feed_response(
+        request, lambda limit: CursorPaginator(get_index_posts(), limit))
+
+
+@require_safe
+@replica_reads
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).first()
+    if group is None:
+        return error('Группа не найдена', 404)
+    return feed_response(
+        request, lambda limit: CursorPaginator(get_group_posts(group), limit),
+        feed=group_feed(group.slug))
+
+
+@require_safe
+@replica_reads
+def profile_posts(request, username):
+    author = User.objects.filter(username=username).first()
+    if author is None:
+        return error('Пользователь не найден', 404)
+    return feed_response(
+        request,
+        lambda limit: CursorPaginator(get_profile_posts(author), limit),
+        feed=author_feed(author.username))
+
+
+@require_safe
+@replica_reads
+def follow_posts(request):
+    if not request.user.is_authenticated:
+        return error('Нужна авторизация', 401)
+    follows = Follow.objects.filter(user=request.user).aggregate(
+        last=Max('pk'), total=Count('pk'))
+    return feed_response(
+        request, lambda limit: get_follow_paginator(request.user, limit),
+        private=True,
+        state=f'{request.user.pk}:{follows["last"]}:{follows["total"]}')
@@ -1,5 +1,15 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from .db import configure_sqlite
+        from .slowlog import install_slow_query_log
+        connection_created.connect(
+            configure_sqlite, dispatch_uid='core.configure_sqlite')
+        connection_created.connect(
+            install_slow_query_log,
+            dispatch_uid='core.install_slow_query_log')
@@ -0,0 +1,155 @@
+import json
+import math
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+
+# Адрес клиента вне INTERNAL_IPS: debug toolbar не включается
+# и не искажает замеры.
+BENCHMARK_REMOTE_ADDR = '192.0.2.1'
+
+
+def make_client(username=None):
+    """Тестовый клиент для замеров, при username — авторизованный."""
+    client = Client(REMOTE_ADDR=BENCHMARK_REMOTE_ADDR)
+    if username:
+        client.force_login(get_user_model().objects.get(username=username))
+    return client
+
+
+def percentile(values, percent):
+    """Перцентиль методом ближайшего ранга."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def run_endpoint(client, url, requests, cold=False):
+    """Прогоняет url через тестовый клиент и собирает статистику."""
+    latencies = []
+    queries = []
+    statuses = {}
+    started = time.perf_counter()
+    for _ in range(requests):
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            request_started = time.perf_counter()
+            response = client.get(url)
+            latencies.append(time.perf_counter() - request_started)
+        queries.append(len(context))
+        status = str(response.status_code)
+        statuses[status] = statuses.get(status, 0) + 1
+    elapsed = time.perf_counter() - started
+    return {
+        'url': url,
+        'requests': requests,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'mean_ms': sum(latencies) / len(latencies) * 1000,
+        'queries_per_request': sum(queries) / len(queries),
+        'max_queries': max(queries),
+        'throughput_rps': requests / elapsed if elapsed else None,
+        'statuses': statuses,
+    }
+
+
+def run(endpoints, requests, cold=False, warmup=1):
+    """Статистика по списку (имя, url, username или None)."""
+    results = {}
+    for name, url, username in endpoints:
+        client = make_client(username)
+        for _ in range(warmup):
+            client.get(url)
+        results[name] = run_endpoint(client, url, requests, cold=cold)
+    return results
+
+
+def summarize(latencies, errors, elapsed):
+    return {
+        'operations': len(latencies),
+        'errors': errors,
+        'ops_per_second': len(latencies) / elapsed if elapsed else None,
+        'p50_ms': (percentile(latencies, 50) or 0) * 1000,
+        'p95_ms': (percentile(latencies, 95) or 0) * 1000,
+        'p99_ms': (percentile(latencies, 99) or 0) * 1000,
+    }
+
+
+def run_concurrent(workers, duration):
+    """Гоняет задачи в потоках duration секунд.
+
+    workers — список (вид, фабрика): фабрика вызывается в своём потоке
+    и возвращает функцию одной операции. Операция, вернувшая False
+    или упавшая, считается ошибкой. Статистика собирается по видам.
+    """
+    stop = threading.Event()
+    lock = threading.Lock()
+    latencies = {kind: [] for kind, _ in workers}
+    errors = {kind: 0 for kind, _ in workers}
+
+    def work(kind, factory):
+        operation = factory()
+        own_latencies = []
+        own_errors = 0
+        try:
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    ok = operation() is not False
+                except Exception:
+                    ok = False
+                if ok:
+                    own_latencies.append(time.perf_counter() - started)
+                else:
+                    own_errors += 1
+        finally:
+            connections.close_all()
+        with lock:
+            latencies[kind].extend(own_latencies)
+            errors[kind] += own_errors
+
+    threads = [
+        threading.Thread(target=work, args=worker) for worker in workers
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {
+        kind: summarize(latencies[kind], errors[kind], elapsed)
+        for kind in latencies
+    }
+
+
+def compare(current, baseline):
+    """Относительные изменения p50/p95/p99 и числа запросов."""
+    deltas = {}
+    for name, stats in current.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        deltas[name] = {
+            key: (stats[key] - previous[key]) / previous[key] * 100
+            for key in ('p50_ms', 'p95_ms', 'p99_ms', 'queries_per_request')
+            if previous.get(key)
+        }
+    return deltas
+
+
+def load(path):
+    with open(path) as source:
+        return json.load(source)['endpoints']
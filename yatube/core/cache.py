@@ -0,0 +1,147 @@
+import hashlib
+import math
+import os
+import random
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.filebased import FileBasedCache
+
+LOCK_POLL_INTERVAL = 0.05
+
+
+def _is_fresh(entry, beta):
+    """Вероятностное раннее обновление (XFetch).
+
+    Чем ближе срок истечения и чем дольше считалось значение,
+    тем выше шанс, что запрос возьмётся пересчитать его заранее.
+    """
+    _, delta, expires = entry
+    jitter = -delta * beta * math.log(1 - random.random())
+    return time.time() + jitter < expires
+
+
+def _lock_path(lock_key):
+    """Файл замка для FileBasedCache, для остальных бэкендов None.
+
+    FileBasedCache.add — это has_key и set, два процесса могут пройти
+    его одновременно. Замок создаётся файлом с O_EXCL рядом с кэшем:
+    создание атомарно на общей файловой системе.
+    """
+    backend = caches['default']
+    if not isinstance(backend, FileBasedCache):
+        return None
+    name = hashlib.md5(lock_key.encode()).hexdigest()
+    return os.path.join(backend._dir, f'{name}.lock')
+
+
+def acquire_lock(lock_key, timeout):
+    """Берёт замок на timeout секунд; True, если он достался нам.
+
+    Взаимное исключение между процессами дают только memcached (add
+    атомарен) и файловый кэш (O_EXCL). LocMemCache у каждого процесса
+    свой и защищает только от потоков одного воркера.
+    """
+    path = _lock_path(lock_key)
+    if path is None:
+        return cache.add(lock_key, 1, timeout)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    for _ in range(2):
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            pass
+        try:
+            if time.time() - os.path.getmtime(path) < timeout:
+                return False
+            # Замок процесса, который упал, не отпустив его.
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    return False
+
+
+def is_locked(lock_key):
+    path = _lock_path(lock_key)
+    if path is None:
+        return cache.get(lock_key) is not None
+    try:
+        age = time.time() - os.path.getmtime(path)
+    except FileNotFoundError:
+        return False
+    return age < settings.CACHE_LOCK_TIMEOUT
+
+
+def release_lock(lock_key):
+    path = _lock_path(lock_key)
+    if path is None:
+        cache.delete(lock_key)
+        return
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+@contextmanager
+def hold_lock(lock_key):
+    """Ждёт замок не дольше CACHE_LOCK_TIMEOUT и держит его в блоке.
+
+    Отдаёт True, если замок взят. Продолжать ли без него, решает
+    вызывающий.
+    """
+    timeout = settings.CACHE_LOCK_TIMEOUT
+    deadline = time.monotonic() + timeout
+    locked = acquire_lock(lock_key, timeout)
+    while not locked and time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        locked = acquire_lock(lock_key, timeout)
+    try:
+        yield locked
+    finally:
+        if locked:
+            release_lock(lock_key)
+
+
+def _wait_for(key, lock_key):
+    deadline = time.monotonic() + settings.CACHE_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+        if not is_locked(lock_key):
+            return None
+        time.sleep(LOCK_POLL_INTERVAL)
+    return None
+
+
+def get_or_compute(key, compute, timeout, cacheable=None):
+    """Значение из кэша с защитой от одновременного пересчёта.
+
+    Пересчитывает значение только тот процесс, который взял блокировку
+    в общем кэше; остальные отдают устаревшее значение или ждут нового.
+    """
+    entry = cache.get(key)
+    if entry is not None and _is_fresh(
+            entry, settings.CACHE_EARLY_REFRESH_BETA):
+        return entry[0]
+    lock_key = f'{key}:lock'
+    locked = acquire_lock(lock_key, settings.CACHE_LOCK_TIMEOUT)
+    if not locked:
+        if entry is None:
+            entry = _wait_for(key, lock_key)
+        if entry is not None:
+            return entry[0]
+    try:
+        started = time.monotonic()
+        value = compute()
+        delta = time.monotonic() - started
+        if cacheable is None or cacheable(value):
+            cache.set(key, (value, delta, time.time() + timeout), timeout)
+    finally:
+        if locked:
+            release_lock(lock_key)
+    return value
@@ -0,0 +1,27 @@
+from django.conf import settings
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Применяет SQLITE_PRAGMAS к каждому новому соединению с SQLite.
+
+    journal_mode=WAL записывается в сам файл базы, остальные настройки
+    действуют только на текущее соединение, поэтому выставляются
+    при каждом подключении. Вместе с CONN_MAX_AGE это происходит
+    раз на соединение, а не раз на запрос.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def get_pragmas(connection):
+    """Текущие значения SQLITE_PRAGMAS на соединении."""
+    values = {}
+    with connection.cursor() as cursor:
+        for name in settings.SQLITE_PRAGMAS:
+            cursor.execute(f'PRAGMA {name}')
+            row = cursor.fetchone()
+            values[name] = row[0] if row else None
+    return values
@@ -0,0 +1,119 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+PROFILES = ('dev', 'prod')
+
+# Запуск WSGI-приложения в отдельном процессе: время импорта
+# настроек, приложений и middleware.
+STARTUP_SCRIPT = (
+    'import time\n'
+    'started = time.perf_counter()\n'
+    'from django.core.wsgi import get_wsgi_application\n'
+    'get_wsgi_application()\n'
+    'print(time.perf_counter() - started)\n'
+)
+
+
+def profile_env(profile):
+    """Окружение дочернего процесса для профиля настроек.
+
+    Для prod подставляются заглушки обязательных переменных. Статики
+    в репозитории нет, поэтому без собранного манифеста prod работает
+    с обычным StaticFilesStorage.
+    """
+    env = dict(os.environ, DJANGO_ENV=profile,
+               DJANGO_SETTINGS_MODULE='yatube.settings')
+    if profile == 'prod':
+        env.setdefault('SECRET_KEY', 'benchmark-only-secret-key')
+        env.setdefault('ALLOWED_HOSTS', 'testserver')
+        static_root = env.get(
+            'STATIC_ROOT', os.path.join(settings.BASE_DIR, 'staticfiles'))
+        if not os.path.exists(
+                os.path.join(static_root, 'staticfiles.json')):
+            env.setdefault(
+                'STATICFILES_STORAGE',
+                'django.contrib.staticfiles.storage.StaticFilesStorage')
+    return env
+
+
+def run_child(args, env):
+    result = subprocess.run(
+        [sys.executable] + args, env=env, cwd=settings.BASE_DIR,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True)
+    if result.returncode:
+        raise CommandError(result.stderr.strip().splitlines()[-1])
+    return result.stdout
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает профили настроек dev и prod: время запуска '
+            'WSGI-приложения и задержку запросов к лентам.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profiles', nargs='+', choices=PROFILES,
+            default=list(PROFILES))
+        parser.add_argument(
+            '--starts', type=int, default=5,
+            help='Сколько раз запускать процесс для замера старта.')
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument(
+            '--only', nargs='+', help='Прогнать только эти страницы.')
+
+    def handle(self, *args, **options):
+        manage = os.path.join(settings.BASE_DIR, 'manage.py')
+        results = {}
+        for profile in options['profiles']:
+            env = profile_env(profile)
+            setups = []
+            processes = []
+            for _ in range(options['starts']):
+                started = time.perf_counter()
+                setups.append(float(run_child(['-c', STARTUP_SCRIPT], env)))
+                processes.append(time.perf_counter() - started)
+            with tempfile.NamedTemporaryFile(suffix='.json') as report:
+                args = [manage, 'benchmark_views',
+                        '--requests', str(options['requests']),
+                        '--json', report.name]
+                if options['only']:
+                    args += ['--only'] + options['only']
+                run_child(args, env)
+                with open(report.name) as source:
+                    endpoints = json.load(source)['endpoints']
+            results[profile] = {
+                'setup_ms': statistics.median(setups) * 1000,
+                'process_ms': statistics.median(processes) * 1000,
+                'endpoints': endpoints,
+            }
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{profile}: запуск приложения '
+                f'{results[profile]["setup_ms"]:.1f}ms, '
+                f'процесса {results[profile]["process_ms"]:.1f}ms'))
+            for name, stats in endpoints.items():
+                self.stdout.write(
+                    f'  {name:<16} p50={stats["p50_ms"]:8.2f}ms '
+                    f'p95={stats["p95_ms"]:8.2f}ms '
+                    f'mean={stats["mean_ms"]:8.2f}ms')
+        if len(results) < 2:
+            return
+        base, other = (results[profile] for profile in options['profiles'])
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{options["profiles"][1]} относительно '
+            f'{options["profiles"][0]}:'))
+        for name, stats in other['endpoints'].items():
+            if name not in base['endpoints']:
+                continue
+            before = base['endpoints'][name]['mean_ms']
+            delta = (stats['mean_ms'] - before) / before * 100
+            self.stdout.write(
+                f'  {name:<16} {stats["mean_ms"] - before:+8.2f}ms '
+                f'на запрос ({delta:+.1f}%)')
@@ -0,0 +1,85 @@
+import json
+import statistics
+
+from django.core.management.base import BaseCommand
+
+from .benchmark_profiles import PROFILES, profile_env, run_child
+
+# Свежий воркер: запуск приложения, по желанию прогрев и первый
+# запрос к каждой ленте. Печатает JSON с замерами в миллисекундах.
+FIRST_REQUEST_SCRIPT = '''
+import json, sys, time
+started = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+boot = time.perf_counter() - started
+from core import warmup
+stats = warmup.warm_up_templates() if sys.argv[1] == 'warm' else None
+from core.benchmark import make_client
+from posts.management.commands.benchmark_views import default_endpoints
+first = {}
+for name, url, username in default_endpoints():
+    if sys.argv[2:] and name not in sys.argv[2:]:
+        continue
+    client = make_client(username)
+    started = time.perf_counter()
+    client.get(url)
+    first[name] = (time.perf_counter() - started) * 1000
+print(json.dumps({
+    'boot_ms': boot * 1000,
+    'warmup_ms': stats['seconds'] * 1000 if stats else 0,
+    'templates': stats['templates'] if stats else 0,
+    'first_ms': first,
+}))
+'''
+
+MODES = ('cold', 'warm')
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает задержку первого запроса к лентам в свежем '
+            'воркере без прогрева шаблонов и с прогревом.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profile', choices=PROFILES, default='prod',
+            help='Профиль настроек; прогрев работает с cached-загрузчиком.')
+        parser.add_argument(
+            '--repeats', type=int, default=3,
+            help='Сколько свежих процессов запускать на режим.')
+        parser.add_argument(
+            '--only', nargs='+', default=[],
+            help='Только эти страницы.')
+
+    def handle(self, *args, **options):
+        env = profile_env(options['profile'])
+        runs = {mode: [] for mode in MODES}
+        for _ in range(options['repeats']):
+            for mode in MODES:
+                output = run_child(
+                    ['-c', FIRST_REQUEST_SCRIPT, mode] + options['only'],
+                    env)
+                runs[mode].append(json.loads(output.strip().splitlines()[-1]))
+        warm = runs['warm']
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{options["profile"]}: прогрев {warm[0]["templates"]} шаблонов '
+            f'за {statistics.median(run["warmup_ms"] for run in warm):.1f}ms'
+            f', запуск приложения '
+            f'{statistics.median(run["boot_ms"] for run in warm):.1f}ms'))
+        self.stdout.write(f'{"":<16} {"cold":>10} {"warm":>10} {"delta":>10}')
+        totals = {mode: 0.0 for mode in MODES}
+        for name in runs['cold'][0]['first_ms']:
+            medians = {
+                mode: statistics.median(
+                    run['first_ms'][name] for run in runs[mode])
+                for mode in MODES
+            }
+            for mode in MODES:
+                totals[mode] += medians[mode]
+            self.stdout.write(
+                f'{name:<16} {medians["cold"]:8.2f}ms '
+                f'{medians["warm"]:8.2f}ms '
+                f'{medians["warm"] - medians["cold"]:+8.2f}ms')
+        self.stdout.write(
+            f'{"всего":<16} {totals["cold"]:8.2f}ms {totals["warm"]:8.2f}ms '
+            f'{totals["warm"] - totals["cold"]:+8.2f}ms')
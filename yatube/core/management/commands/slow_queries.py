@@ -0,0 +1,50 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import slowlog
+
+
+class Command(BaseCommand):
+    help = ('Печатает самые тяжёлые формы запросов из журнала '
+            'медленных запросов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--log', default=None,
+            help='Журнал, по умолчанию SLOW_QUERY_LOG.')
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument(
+            '--order', choices=('total', 'max', 'count'), default='total',
+            help='Сортировка: суммарное время, худший случай или частота.')
+        parser.add_argument(
+            '--since', type=float, default=None,
+            help='Только записи за последние N часов.')
+
+    def handle(self, *args, **options):
+        path = options['log'] or settings.SLOW_QUERY_LOG
+        if not path or not os.path.exists(path):
+            raise CommandError(f'Журнал не найден: {path}')
+        entries = slowlog.read_log(path)
+        if options['since'] is not None:
+            border = time.time() - options['since'] * 3600
+            entries = (entry for entry in entries if entry['time'] >= border)
+        offenders = slowlog.top_offenders(
+            entries, limit=options['limit'], order=options['order'])
+        if not offenders:
+            self.stdout.write(self.style.SUCCESS('Медленных запросов нет'))
+            return
+        for number, group in enumerate(offenders, 1):
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{number}. [{group["shape"]}] {group["count"]} раз, '
+                f'всего {group["total_ms"]:.1f} мс, '
+                f'в среднем {group["total_ms"] / group["count"]:.1f} мс, '
+                f'максимум {group["max_ms"]:.1f} мс, '
+                f'разных параметров {len(group["params"])}'))
+            self.stdout.write(f'  {group["sql"]}')
+            for view, count in group['views'].most_common(3):
+                self.stdout.write(f'  вьюха {view or "-"}: {count}')
+            for frame, count in group['frames'].most_common(3):
+                self.stdout.write(f'  место {frame or "-"}: {count}')
@@ -0,0 +1,78 @@
+import time
+
+from django.conf import settings
+
+from . import profiling
+from .routers import has_written, reset_writes
+
+PIN_COOKIE = 'primary_pin'
+
+
+class PrimaryPinMiddleware:
+    """Read-your-writes: после записи пользователь читает с основной базы.
+
+    Запрос, который что-то записал в базу (в том числе GET, как
+    подписка), ставит куку со сроком закрепления, и пока он не истёк,
+    replica_reads не уводит чтения на реплики, которые могут ещё
+    не догнать основную базу.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.pin_primary = self.is_pinned(request)
+        reset_writes()
+        response = self.get_response(request)
+        if settings.DATABASE_REPLICAS and has_written():
+            seconds = settings.REPLICA_PIN_SECONDS
+            response.set_cookie(
+                PIN_COOKIE, str(int(time.time() + seconds)),
+                max_age=seconds, httponly=True, samesite='Lax')
+        return response
+
+    def is_pinned(self, request):
+        try:
+            return int(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unresolved'
+
+
+class ProfilingMiddleware:
+    """Замеры запросов по вьюхам для production.
+
+    Каждый запрос только учитывается в счётчике. Доля
+    PROFILING_SAMPLE_RATE запросов профилируется: время ответа,
+    число и время SQL, время шаблонов, попадания в кэш и размер
+    ответа. Метрики отдаются в формате Prometheus (core.views.metrics)
+    и хранятся в памяти процесса, так что у каждого воркера свои.
+    Имя текущей вьюхи доступно через profiling.current_view(), им
+    помечает запросы журнал медленных запросов.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            if not profiling.is_sampled():
+                response = self.get_response(request)
+                profiling.registry.count(view_name(request))
+                return response
+            with profiling.profile(profiling.Sample()) as sample:
+                started = time.perf_counter()
+                response = self.get_response(request)
+                wall = time.perf_counter() - started
+        finally:
+            profiling.set_current_view(None)
+        size = 0 if response.streaming else len(response.content)
+        profiling.registry.record(view_name(request), sample, wall, size)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profiling.set_current_view(view_name(request))
@@ -0,0 +1,317 @@
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+from .benchmark import percentile
+
+_state = threading.local()
+_MISSING = object()
+
+QUANTILES = (50, 95, 99)
+
+
+class Sample:
+    """Замеры одного запроса."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+def current_sample():
+    return getattr(_state, 'sample', None)
+
+
+def current_view():
+    """Имя вьюхи, которая сейчас обрабатывает запрос в этом потоке."""
+    return getattr(_state, 'view', None)
+
+
+def set_current_view(name):
+    _state.view = name
+
+
+def is_sampled():
+    rate = settings.PROFILING_SAMPLE_RATE
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+def sql_wrapper(execute, sql, params, many, context):
+    sample = current_sample()
+    if sample is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample.queries += 1
+        sample.sql_time += time.perf_counter() - started
+
+
+@contextmanager
+def count_cache_hits(sample):
+    """Считает попадания и промахи кэша по умолчанию.
+
+    Обёртки ставятся на объект бэкенда текущего потока, поэтому
+    не задевают другие потоки. get внутри get_many не считается
+    повторно.
+    """
+    backend = caches['default']
+    get, get_many = backend.get, backend.get_many
+    nested = []
+
+    def counting_get(key, default=None, version=None):
+        value = get(key, _MISSING, version=version)
+        if not nested:
+            if value is _MISSING:
+                sample.cache_misses += 1
+            else:
+                sample.cache_hits += 1
+        return default if value is _MISSING else value
+
+    def counting_get_many(keys, version=None):
+        keys = list(keys)
+        nested.append(True)
+        try:
+            found = get_many(keys, version=version)
+        finally:
+            nested.pop()
+        sample.cache_hits += len(found)
+        sample.cache_misses += len(keys) - len(found)
+        return found
+
+    backend.get, backend.get_many = counting_get, counting_get_many
+    try:
+        yield
+    finally:
+        del backend.get, backend.get_many
+
+
+@contextmanager
+def profile(sample):
+    """Собирает SQL, время шаблонов и обращения к кэшу в sample."""
+    _state.sample = sample
+    try:
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(sql_wrapper))
+            stack.enter_context(count_cache_hits(sample))
+            yield sample
+    finally:
+        _state.sample = None
+
+
+class ProfiledTemplate(Template):
+    def render(self, context=None, request=None):
+        sample = current_sample()
+        if sample is None or sample.template_depth:
+            return super().render(context, request)
+        sample.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            sample.template_time += time.perf_counter() - started
+            sample.template_depth -= 1
+
+
+class ProfilingTemplates(DjangoTemplates):
+    """Шаблонизатор Django, который замеряет рендеринг для профилировщика.
+
+    Считается только внешний render: include и наследование входят
+    в его время.
+    """
+
+    def from_string(self, template_code):
+        template = super().from_string(template_code)
+        return ProfiledTemplate(template.template, self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return ProfiledTemplate(template.template, self)
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин."""
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.bounds + ('+Inf',), self.counts):
+            total += count
+            yield bound, total
+
+
+class ViewStats:
+    def __init__(self):
+        buckets = settings.PROFILING_BUCKETS
+        self.requests = 0
+        self.wall = Histogram(buckets)
+        self.sql = Histogram(buckets)
+        self.templates = Histogram(buckets)
+        self.queries = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.response_bytes = 0
+        self.recent = deque(maxlen=settings.PROFILING_WINDOW)
+
+
+class Registry:
+    """Метрики вьюх в памяти процесса.
+
+    Гистограммы накопительные, как ждёт Prometheus; перцентили
+    считаются по скользящему окну последних замеров.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+        self.gauges = {}
+
+    def stats(self, view):
+        if view not in self.views:
+            self.views[view] = ViewStats()
+        return self.views[view]
+
+    def count(self, view):
+        with self.lock:
+            self.stats(view).requests += 1
+
+    def record(self, view, sample, wall, size):
+        with self.lock:
+            stats = self.stats(view)
+            stats.requests += 1
+            stats.wall.observe(wall)
+            stats.sql.observe(sample.sql_time)
+            stats.templates.observe(sample.template_time)
+            stats.queries += sample.queries
+            stats.cache_hits += sample.cache_hits
+            stats.cache_misses += sample.cache_misses
+            stats.response_bytes += size
+            stats.recent.append(wall)
+
+    def set_gauge(self, name, help_text, value):
+        """Разовое значение процесса, например время прогрева."""
+        with self.lock:
+            self.gauges[name] = (help_text, value)
+
+    def reset(self):
+        with self.lock:
+            self.views.clear()
+            self.gauges.clear()
+
+    def snapshot(self):
+        """Сводка по вьюхам: число замеров и перцентили окна, мс."""
+        with self.lock:
+            return {
+                view: {
+                    'requests': stats.requests,
+                    'sampled': stats.wall.count,
+                    **{
+                        f'p{percent}_ms': percentile(
+                            [value * 1000 for value in stats.recent],
+                            percent)
+                        for percent in QUANTILES
+                    },
+                }
+                for view, stats in self.views.items()
+            }
+
+    def render(self):
+        """Метрики в текстовом формате Prometheus."""
+        with self.lock:
+            views = sorted(self.views.items())
+            lines = []
+
+            def metric(name, kind, help_text, rows):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                for suffix, labels, value in rows:
+                    lines.append(
+                        f'{name}{suffix}{format_labels(labels)} {value}')
+
+            def counter(name, help_text, attribute):
+                metric(name, 'counter', help_text, [
+                    ('', {'view': view}, getattr(stats, attribute))
+                    for view, stats in views
+                ])
+
+            def histogram(name, help_text, attribute):
+                rows = []
+                for view, stats in views:
+                    hist = getattr(stats, attribute)
+                    rows += [
+                        ('_bucket', {'view': view, 'le': bound}, total)
+                        for bound, total in hist.cumulative()
+                    ]
+                    rows.append(('_sum', {'view': view}, hist.sum))
+                    rows.append(('_count', {'view': view}, hist.count))
+                metric(name, 'histogram', help_text, rows)
+
+            counter('yatube_requests_total',
+                    'Все запросы по вьюхам.', 'requests')
+            histogram('yatube_request_duration_seconds',
+                      'Время ответа выборочных запросов.', 'wall')
+            histogram('yatube_sql_duration_seconds',
+                      'Время SQL на выборочный запрос.', 'sql')
+            histogram('yatube_template_duration_seconds',
+                      'Время рендеринга шаблонов на выборочный запрос.',
+                      'templates')
+            counter('yatube_sql_queries_total',
+                    'SQL-запросы выборочных запросов.', 'queries')
+            counter('yatube_cache_hits_total',
+                    'Попадания в кэш выборочных запросов.', 'cache_hits')
+            counter('yatube_cache_misses_total',
+                    'Промахи кэша выборочных запросов.', 'cache_misses')
+            counter('yatube_response_bytes_total',
+                    'Размер ответов выборочных запросов.',
+                    'response_bytes')
+            metric(
+                'yatube_request_duration_recent_seconds', 'summary',
+                'Перцентили времени ответа по скользящему окну.',
+                [
+                    ('', {'view': view, 'quantile': percent / 100},
+                     percentile(list(stats.recent), percent))
+                    for view, stats in views if stats.recent
+                    for percent in QUANTILES
+                ])
+            for name, (help_text, value) in sorted(self.gauges.items()):
+                metric(name, 'gauge', help_text, [('', {}, value)])
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+
+    def escape(value):
+        return str(value).replace('\\', r'\\').replace(
+            '"', r'\"').replace('\n', r'\n')
+    return '{' + ','.join(
+        f'{key}="{escape(value)}"' for key, value in labels.items()) + '}'
+
+
+registry = Registry()
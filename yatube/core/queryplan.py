@@ -0,0 +1,52 @@
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .benchmark import make_client
+
+# «SCAN posts_post» без индекса — полный проход по таблице.
+# «SCAN ... USING INDEX» — упорядоченный обход индекса, он не считается.
+FULL_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(\w+)(?:\s+AS\s+\w+)?$')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+def explain(sql, using=connection):
+    """Строки EXPLAIN QUERY PLAN для SQL-запроса (только SQLite)."""
+    with using.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def full_scans(plan):
+    """Таблицы, которые план читает целиком."""
+    scans = []
+    for line in plan:
+        match = FULL_SCAN_RE.match(line.strip())
+        if match:
+            scans.append(match.group(1))
+    return scans
+
+
+def temp_sorts(plan):
+    """Шаги плана, сортирующие во временном B-дереве."""
+    return [line for line in plan if TEMP_SORT in line]
+
+
+def capture_plans(url, username=None):
+    """Запрашивает страницу и возвращает планы всех её SELECT-ов.
+
+    Кэш очищается, чтобы страница выполнила все свои запросы.
+    """
+    client = make_client(username)
+    cache.clear()
+    with CaptureQueriesContext(connection) as context:
+        client.get(url)
+    plans = []
+    for query in context.captured_queries:
+        sql = query['sql']
+        if not sql.lstrip().upper().startswith('SELECT'):
+            continue
+        plans.append((sql, explain(sql)))
+    return plans
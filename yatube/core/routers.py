@@ -0,0 +1,99 @@
+import random
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_state = threading.local()
+
+
+@contextmanager
+def use_replicas():
+    """Внутри блока чтения уходят на реплики из DATABASE_REPLICAS."""
+    previous = getattr(_state, 'replicas', False)
+    _state.replicas = True
+    try:
+        yield
+    finally:
+        _state.replicas = previous
+
+
+@contextmanager
+def use_primary():
+    """Внутри блока чтения идут в основную базу, даже под replica_reads."""
+    previous = getattr(_state, 'replicas', False)
+    _state.replicas = False
+    try:
+        yield
+    finally:
+        _state.replicas = previous
+
+
+@contextmanager
+def untracked_writes():
+    """Записи внутри блока не закрепляют пользователя за основной базой.
+
+    Для служебных записей при чтении, например ленивого создания
+    счётчика: пользователь ничего не менял и может читать с реплик.
+    """
+    wrote = has_written()
+    try:
+        yield
+    finally:
+        _state.wrote = wrote
+
+
+def reset_writes():
+    _state.wrote = False
+
+
+def has_written():
+    """Была ли запись в основную базу с последнего reset_writes()."""
+    return getattr(_state, 'wrote', False)
+
+
+def replica_reads(view):
+    """Читает данные вьюхи с реплик.
+
+    Только для безопасных методов и только если пользователь не
+    закреплён за основной базой после своей записи (см.
+    core.middleware.PrimaryPinMiddleware).
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (request.method not in ('GET', 'HEAD')
+                or getattr(request, 'pin_primary', False)):
+            return view(request, *args, **kwargs)
+        with use_replicas():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """Чтения внутри use_replicas — на случайную реплику, остальное —
+    на основную базу.
+
+    Внутри транзакции основной базы чтения тоже идут в неё, чтобы
+    видеть свои же незакоммиченные изменения.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or not getattr(_state, 'replicas', False):
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        return obj1._state.db in aliases and obj2._state.db in aliases
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db not in settings.DATABASE_REPLICAS
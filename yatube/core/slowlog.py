@@ -0,0 +1,136 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+from .profiling import current_view
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+
+# Обёртки и middleware ядра — не источник запроса, их кадры пропускаются.
+SKIPPED_FILES = ('core/slowlog.py', 'core/profiling.py', 'core/middleware.py')
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_SPACE = re.compile(r'\s+')
+
+
+def normalize(sql):
+    """Форма запроса: литералы и плейсхолдеры заменены на ?, списки
+    IN (...) любой длины сведены к одному виду."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _LIST.sub('(...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def fingerprint(value):
+    return hashlib.md5(repr(value).encode()).hexdigest()[:12]
+
+
+def project_frame(frame):
+    """Первый кадр стека из кода проекта: 'posts/views.py:follow_index'."""
+    base = os.path.join(settings.BASE_DIR, '')
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(base) and 'site-packages' not in filename:
+            path = os.path.relpath(filename, base).replace(os.sep, '/')
+            if path not in SKIPPED_FILES:
+                return f'{path}:{frame.f_code.co_name}'
+        frame = frame.f_back
+    return None
+
+
+def slow_query_wrapper(execute, sql, params, many, context):
+    """Пишет в журнал запросы дольше SLOW_QUERY_THRESHOLD_MS."""
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = (time.perf_counter() - started) * 1000
+        if duration >= settings.SLOW_QUERY_THRESHOLD_MS:
+            log_slow_query(sql, params, duration, context['connection'])
+
+
+def log_slow_query(sql, params, duration, connection):
+    shape = normalize(sql)
+    entry = {
+        'time': time.time(),
+        'database': connection.alias,
+        'duration_ms': round(duration, 3),
+        'shape': fingerprint(shape),
+        'sql': shape,
+        'params': fingerprint(params),
+        'view': current_view(),
+        'frame': project_frame(sys._getframe(2)),
+    }
+    logger.warning(
+        'Медленный запрос %.1f мс (%s, %s): %s',
+        duration, entry['view'], entry['frame'], sql)
+    if not settings.SLOW_QUERY_LOG:
+        return
+    line = json.dumps(entry, ensure_ascii=False) + '\n'
+    try:
+        with _lock, open(settings.SLOW_QUERY_LOG, 'a',
+                         encoding='utf-8') as target:
+            target.write(line)
+    except OSError:
+        logger.exception('Не удалось записать %s', settings.SLOW_QUERY_LOG)
+
+
+def install_slow_query_log(sender, connection, **kwargs):
+    """Ставит обёртку журнала на каждое новое соединение.
+
+    Обёртка кладётся в начало списка: execute_wrapper() снимает
+    последний элемент, и соединение, открытое внутри profile(),
+    иначе потеряло бы журнал, а обёртка профилировщика осталась бы
+    навсегда и считала запросы дважды.
+    """
+    if slow_query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, slow_query_wrapper)
+
+
+def read_log(path):
+    with open(path, encoding='utf-8') as source:
+        for line in source:
+            if line.strip():
+                yield json.loads(line)
+
+
+def top_offenders(entries, limit=10, order='total'):
+    """Формы запросов с наибольшим суммарным (или худшим) временем."""
+    groups = {}
+    for entry in entries:
+        group = groups.setdefault(entry['shape'], {
+            'shape': entry['shape'],
+            'sql': entry['sql'],
+            'count': 0,
+            'total_ms': 0.0,
+            'max_ms': 0.0,
+            'views': Counter(),
+            'frames': Counter(),
+            'params': set(),
+        })
+        group['count'] += 1
+        group['total_ms'] += entry['duration_ms']
+        group['max_ms'] = max(group['max_ms'], entry['duration_ms'])
+        group['views'][entry['view']] += 1
+        group['frames'][entry['frame']] += 1
+        group['params'].add(entry['params'])
+    key = {
+        'total': lambda group: group['total_ms'],
+        'max': lambda group: group['max_ms'],
+        'count': lambda group: group['count'],
+    }[order]
+    return sorted(groups.values(), key=key, reverse=True)[:limit]
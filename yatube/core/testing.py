@@ -0,0 +1,43 @@
+from contextlib import ContextDecorator
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class query_budget(ContextDecorator):
+    """Проверяет, что блок кода укладывается в число SQL-запросов.
+
+    Работает как контекстный менеджер и как декоратор:
+
+        with query_budget(5):
+            client.get('/')
+    """
+    def __init__(self, budget, using=DEFAULT_DB_ALIAS):
+        self.budget = budget
+        self.using = using
+
+    def __enter__(self):
+        self.context = CaptureQueriesContext(connections[self.using])
+        self.context.__enter__()
+        return self.context
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.context.__exit__(exc_type, exc_value, traceback)
+        if exc_type is not None:
+            return False
+        executed = len(self.context)
+        if executed > self.budget:
+            queries = '\n'.join(
+                f'{number}. {query["sql"]}'
+                for number, query in enumerate(
+                    self.context.captured_queries, start=1)
+            )
+            raise QueryBudgetExceeded(
+                f'Выполнено {executed} SQL-запросов при бюджете '
+                f'{self.budget}:\n{queries}'
+            )
+        return False
@@ -1,6 +1,37 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
 from http import HTTPStatus
+from io import StringIO
+from unittest import mock
 
-from django.test import TestCase
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.template import engines
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+
+from .benchmark import percentile, run_concurrent
+from .management.commands.benchmark_profiles import profile_env
+from .cache import acquire_lock, get_or_compute, is_locked, release_lock
+from .db import get_pragmas
+from .middleware import PIN_COOKIE, PrimaryPinMiddleware
+from .profiling import Histogram, current_sample, registry
+from .queryplan import full_scans, temp_sorts
+from .routers import (ReplicaRouter, replica_reads, untracked_writes,
+                      use_primary, use_replicas)
+from .slowlog import (install_slow_query_log, normalize, read_log,
+                      slow_query_wrapper, top_offenders)
+from .warmup import project_template_names, warm_up_templates
+from .testing import QueryBudgetExceeded, query_budget
 
 
 class ViewTestClass(TestCase):
@@ -9,3 +40,370 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class GetOrComputeTests(SimpleTestCase):
+    """Проверка кэша с защитой от одновременного пересчёта."""
+    def setUp(self):
+        cache.clear()
+
+    def test_value_is_computed_once(self):
+        compute = mock.Mock(return_value='value')
+        for _ in range(3):
+            self.assertEqual(get_or_compute('key', compute, 60), 'value')
+        compute.assert_called_once()
+
+    def test_stale_value_returned_while_locked(self):
+        get_or_compute('key', lambda: 'old', 60)
+        cache.add('key:lock', 1)
+        compute = mock.Mock(return_value='new')
+        with mock.patch('core.cache._is_fresh', return_value=False):
+            self.assertEqual(get_or_compute('key', compute, 60), 'old')
+        compute.assert_not_called()
+
+    @override_settings(CACHE_LOCK_TIMEOUT=0)
+    def test_computes_when_lock_holder_gives_up(self):
+        cache.add('key:lock', 1)
+        self.assertEqual(get_or_compute('key', lambda: 'value', 60), 'value')
+        self.assertIsNotNone(cache.get('key:lock'))
+
+    def test_uncacheable_value_is_not_stored(self):
+        get_or_compute('key', lambda: None, 60, cacheable=bool)
+        self.assertIsNone(cache.get('key'))
+
+    def test_file_cache_lock_is_exclusive(self):
+        """У файлового кэша замок — файл с O_EXCL, а не cache.add."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        with override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.'
+                           'FileBasedCache',
+                'LOCATION': directory}}):
+            self.assertTrue(acquire_lock('key:lock', 60))
+            self.assertFalse(acquire_lock('key:lock', 60))
+            self.assertTrue(is_locked('key:lock'))
+            release_lock('key:lock')
+            self.assertFalse(is_locked('key:lock'))
+            self.assertTrue(acquire_lock('key:lock', 60))
+            self.assertTrue(acquire_lock('key:lock', 0))
+
+
+class QueryBudgetTests(TestCase):
+    """Проверка бюджета SQL-запросов."""
+    def test_budget_exceeded(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            with query_budget(1):
+                list(get_user_model().objects.all())
+                list(get_user_model().objects.all())
+
+    def test_decorator_within_budget(self):
+        @query_budget(1)
+        def load_users():
+            return list(get_user_model().objects.all())
+        self.assertEqual(load_users(), [])
+
+
+class PercentileTests(SimpleTestCase):
+    """Проверка перцентилей бенчмарка."""
+    def test_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
+        self.assertIsNone(percentile([], 50))
+
+
+class QueryPlanTests(SimpleTestCase):
+    """Разбор EXPLAIN QUERY PLAN."""
+    def test_full_scans(self):
+        plan = [
+            'SCAN posts_post',
+            'SCAN TABLE posts_group AS U0',
+            'SCAN posts_post USING INDEX posts_post_pub_date_idx',
+            'SEARCH auth_user USING INTEGER PRIMARY KEY (rowid=?)',
+            'USE TEMP B-TREE FOR ORDER BY',
+        ]
+        self.assertEqual(full_scans(plan), ['posts_post', 'posts_group'])
+        self.assertEqual(temp_sorts(plan), ['USE TEMP B-TREE FOR ORDER BY'])
+
+
+class SqlitePragmasTests(TestCase):
+    """Настройки SQLite применяются к соединению."""
+    def test_pragmas_applied(self):
+        pragmas = get_pragmas(connection)
+        self.assertEqual(pragmas['synchronous'], 1)
+        self.assertEqual(pragmas['busy_timeout'], 5000)
+        self.assertEqual(pragmas['cache_size'], -20000)
+
+
+class RunConcurrentTests(SimpleTestCase):
+    """Статистика конкурентного прогона по видам операций."""
+    def test_counts_operations_and_errors(self):
+        results = run_concurrent([
+            ('ok', lambda: lambda: True),
+            ('fail', lambda: lambda: False),
+        ], duration=0.05)
+        self.assertGreater(results['ok']['operations'], 0)
+        self.assertEqual(results['ok']['errors'], 0)
+        self.assertEqual(results['fail']['operations'], 0)
+        self.assertGreater(results['fail']['errors'], 0)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(SimpleTestCase):
+    """Маршрутизация чтений на реплики и закрепление после записи."""
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def read_alias(self, request):
+        @replica_reads
+        def view(request):
+            return HttpResponse(self.router.db_for_read(None))
+        return PrimaryPinMiddleware(view)(request).content.decode()
+
+    def test_reads_go_to_replica_only_inside_block(self):
+        self.assertEqual(self.router.db_for_read(None), 'default')
+        with use_replicas():
+            self.assertEqual(self.router.db_for_read(None), 'replica')
+            self.assertEqual(self.router.db_for_write(None), 'default')
+            with use_primary():
+                self.assertEqual(self.router.db_for_read(None), 'default')
+            self.assertEqual(self.router.db_for_read(None), 'replica')
+        self.assertFalse(self.router.allow_migrate('replica', 'posts'))
+
+    def test_safe_views_read_from_replica(self):
+        self.assertEqual(self.read_alias(self.factory.get('/')), 'replica')
+        self.assertEqual(self.read_alias(self.factory.post('/')), 'default')
+
+    def test_writer_is_pinned_to_primary(self):
+        def write(request):
+            self.router.db_for_write(None)
+            return HttpResponse()
+        response = PrimaryPinMiddleware(write)(self.factory.get('/'))
+        self.assertIn(PIN_COOKIE, response.cookies)
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = response.cookies[PIN_COOKIE].value
+        self.assertEqual(self.read_alias(request), 'default')
+        request.COOKIES[PIN_COOKIE] = '0'
+        self.assertEqual(self.read_alias(request), 'replica')
+
+    def test_untracked_writes_do_not_pin(self):
+        def backfill(request):
+            with untracked_writes():
+                self.router.db_for_write(None)
+            return HttpResponse()
+        response = PrimaryPinMiddleware(backfill)(self.factory.get('/'))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_configured(self):
+        self.assertEqual(self.read_alias(self.factory.get('/')), 'default')
+
+
+class ProfilingTests(TestCase):
+    """Проверка профилирующего middleware и /metrics/."""
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        self.addCleanup(registry.reset)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram((0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value)
+        self.assertEqual(
+            list(histogram.cumulative()), [(0.1, 2), (1, 3), ('+Inf', 4)])
+        self.assertEqual(histogram.count, 4)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_sampled_request_is_measured(self):
+        self.client.get('/')
+        self.client.get('/')
+        stats = registry.views['posts:index']
+        self.assertEqual(stats.requests, 2)
+        self.assertEqual(stats.wall.count, 2)
+        self.assertGreater(stats.queries, 0)
+        self.assertGreater(stats.templates.sum, 0)
+        self.assertGreater(stats.cache_hits, 0)
+        self.assertGreater(stats.response_bytes, 0)
+        self.assertEqual(registry.snapshot()['posts:index']['sampled'], 2)
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_unsampled_request_is_only_counted(self):
+        self.client.get('/')
+        stats = registry.views['posts:index']
+        self.assertEqual(stats.requests, 1)
+        self.assertEqual(stats.wall.count, 0)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_metrics_endpoint(self):
+        self.client.get('/about/author/')
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="about:author"} 1',
+            response.content.decode())
+        response = self.client.get('/metrics/', REMOTE_ADDR='192.0.2.1')
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+
+
+class SlowQueryLogTests(TestCase):
+    """Проверка журнала медленных запросов."""
+    def setUp(self):
+        cache.clear()
+        handle, self.log = tempfile.mkstemp(suffix='.log')
+        os.close(handle)
+        self.addCleanup(os.remove, self.log)
+
+    def test_normalize_merges_literals_and_in_lists(self):
+        self.assertEqual(
+            normalize('SELECT * FROM t WHERE id IN (%s, %s,  %s)\n'
+                      "AND name = 'x' LIMIT 21"),
+            normalize('SELECT * FROM t WHERE id IN (%s) '
+                      "AND name = 'it''s' LIMIT 5"))
+
+    def test_slow_query_attributed_to_view_and_frame(self):
+        with self.settings(SLOW_QUERY_THRESHOLD_MS=0,
+                           SLOW_QUERY_LOG=self.log), \
+                self.assertLogs('core.slowlog', 'WARNING'):
+            self.client.get('/')
+        entries = list(read_log(self.log))
+        self.assertTrue(entries)
+        self.assertEqual(
+            {entry['view'] for entry in entries}, {'posts:index'})
+        self.assertTrue(any(
+            (entry['frame'] or '').startswith('posts/')
+            for entry in entries))
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_connection_opened_while_profiling_keeps_wrappers(self):
+        self.addCleanup(setattr, connection, 'execute_wrappers',
+                        list(connection.execute_wrappers))
+        registry.reset()
+        self.addCleanup(registry.reset)
+        connection.execute_wrappers.clear()
+        ensure_connection = connection.ensure_connection
+        fresh = [True]
+
+        def reconnect():
+            # Первый запрос профилируемой вьюхи открывает соединение.
+            ensure_connection()
+            if fresh and current_sample() is not None:
+                fresh.pop()
+                install_slow_query_log(connection.__class__, connection)
+
+        with mock.patch.object(connection, 'ensure_connection', reconnect):
+            self.client.get('/')
+        self.assertFalse(fresh)
+        self.assertEqual(connection.execute_wrappers, [slow_query_wrapper])
+        registry.reset()
+        cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get('/')
+        self.assertTrue(captured)
+        self.assertEqual(registry.views['posts:index'].queries, len(captured))
+
+    def test_fast_queries_are_not_logged(self):
+        with self.settings(SLOW_QUERY_THRESHOLD_MS=10 ** 6,
+                           SLOW_QUERY_LOG=self.log):
+            self.client.get('/')
+        self.assertEqual(os.path.getsize(self.log), 0)
+
+    def test_top_offenders_command(self):
+        entries = [
+            {'time': 0, 'duration_ms': duration, 'shape': shape,
+             'sql': f'SELECT {shape}', 'params': str(duration),
+             'view': 'posts:index', 'frame': 'posts/views.py:index'}
+            for shape, duration in (('a', 5), ('a', 7), ('b', 100))
+        ]
+        with open(self.log, 'w') as target:
+            target.writelines(json.dumps(entry) + '\n' for entry in entries)
+        self.assertEqual(
+            [group['shape'] for group in top_offenders(entries)], ['b', 'a'])
+        self.assertEqual(
+            [group['shape']
+             for group in top_offenders(entries, order='count')],
+            ['a', 'b'])
+        out = StringIO()
+        call_command('slow_queries', log=self.log, limit=1, stdout=out)
+        self.assertIn('SELECT b', out.getvalue())
+        self.assertNotIn('SELECT a', out.getvalue())
+
+
+class SettingsProfilesTests(SimpleTestCase):
+    """Проверка профилей настроек в отдельных процессах."""
+    SCRIPT = (
+        'import json\n'
+        'from django.conf import settings\n'
+        'print(json.dumps([settings.DEBUG, settings.INSTALLED_APPS, '
+        'settings.MIDDLEWARE, settings.STATICFILES_STORAGE, '
+        "settings.CACHES['default']]))\n"
+    )
+
+    def load(self, env):
+        result = subprocess.run(
+            [sys.executable, '-c', self.SCRIPT], env=env,
+            cwd=settings.BASE_DIR, stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE, universal_newlines=True)
+        return result.returncode, result.stdout, result.stderr
+
+    def test_prod_strips_debug_tooling(self):
+        env = profile_env('prod')
+        env.pop('STATICFILES_STORAGE', None)
+        env.pop('CACHE_BACKEND', None)
+        code, out, err = self.load(env)
+        self.assertEqual(code, 0, err)
+        debug, apps, middleware, storage, default_cache = json.loads(out)
+        self.assertFalse(debug)
+        self.assertNotIn('debug_toolbar', apps)
+        self.assertNotIn(
+            'debug_toolbar.middleware.DebugToolbarMiddleware', middleware)
+        self.assertIn('django.middleware.gzip.GZipMiddleware', middleware)
+        self.assertTrue(storage.endswith('ManifestStaticFilesStorage'))
+        self.assertTrue(default_cache['BACKEND'].endswith('FileBasedCache'))
+        self.assertGreater(default_cache['OPTIONS']['MAX_ENTRIES'], 300)
+
+    def test_dev_keeps_debug_toolbar(self):
+        code, out, err = self.load(profile_env('dev'))
+        self.assertEqual(code, 0, err)
+        debug, apps, _, _, _ = json.loads(out)
+        self.assertTrue(debug)
+        self.assertIn('debug_toolbar', apps)
+
+    def test_prod_requires_secret_key(self):
+        env = profile_env('prod')
+        env['SECRET_KEY'] = ''
+        code, _, err = self.load(env)
+        self.assertNotEqual(code, 0)
+        self.assertIn('SECRET_KEY', err)
+
+
+class TemplateWarmupTests(SimpleTestCase):
+    """Проверка прогрева шаблонов."""
+    def setUp(self):
+        registry.reset()
+        self.addCleanup(registry.reset)
+
+    def templates(self, debug):
+        return [{
+            **settings.TEMPLATES[0],
+            'OPTIONS': {**settings.TEMPLATES[0]['OPTIONS'], 'debug': debug},
+        }]
+
+    def test_project_templates_compiled_into_cache(self):
+        with self.settings(TEMPLATES=self.templates(debug=False)):
+            engine = engines.all()[0]
+            names = project_template_names(engine)
+            self.assertIn('posts/includes/paginator.html', names)
+            self.assertFalse(any(name.startswith('admin/') for name in names))
+            stats = warm_up_templates()
+            self.assertEqual(stats['templates'], len(names))
+            self.assertEqual(stats['errors'], 0)
+            cached = engine.engine.template_loaders[0].get_template_cache
+            self.assertIn('includes/comment.html', cached)
+        self.assertIn('yatube_template_warmup_templates ', registry.render())
+
+    def test_skipped_without_cached_loader(self):
+        with self.settings(TEMPLATES=self.templates(debug=True)):
+            self.assertEqual(warm_up_templates()['templates'], 0)
@@ -1,7 +1,12 @@
 from http import HTTPStatus
 
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
 from django.shortcuts import render
 
+from .profiling import registry
+
 
 def page_not_found(request, exception):
     return render(
@@ -20,3 +25,13 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def metrics(request):
+    """Метрики профилировщика для Prometheus."""
+    allowed = settings.PROFILING_METRICS_IPS
+    if allowed and request.META.get('REMOTE_ADDR') not in allowed:
+        raise PermissionDenied
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,76 @@
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.template import TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.template.loaders.cached import Loader as CachedLoader
+
+from .profiling import registry
+
+logger = logging.getLogger(__name__)
+
+
+def project_template_names(engine):
+    """Имена шаблонов из каталогов проекта (без шаблонов пакетов)."""
+    base = os.path.join(settings.BASE_DIR, '')
+    names = set()
+    for directory in engine.template_dirs:
+        if not directory.startswith(base):
+            continue
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                if filename.startswith('.'):
+                    continue
+                path = os.path.relpath(os.path.join(root, filename), directory)
+                names.add(path.replace(os.sep, '/'))
+    return sorted(names)
+
+
+def has_cached_loader(engine):
+    return any(
+        isinstance(loader, CachedLoader)
+        for loader in engine.engine.template_loaders)
+
+
+def warm_up_templates():
+    """Компилирует шаблоны проекта в кэш cached-загрузчика.
+
+    Без прогрева каждый воркер разбирает base.html, карточку поста,
+    пагинатор и прочие include при первом запросе к странице. Движки
+    без cached-загрузчика (dev с DEBUG) пропускаются: там кэша нет.
+    """
+    started = time.perf_counter()
+    compiled = errors = 0
+    for engine in engines.all():
+        if not isinstance(engine, DjangoTemplates) or not has_cached_loader(
+                engine):
+            continue
+        for name in project_template_names(engine):
+            try:
+                engine.get_template(name)
+            except TemplateSyntaxError:
+                errors += 1
+                logger.exception('Шаблон %s не компилируется', name)
+            else:
+                compiled += 1
+    seconds = time.perf_counter() - started
+    registry.set_gauge(
+        'yatube_template_warmup_seconds',
+        'Время прогрева шаблонов при старте воркера.', seconds)
+    registry.set_gauge(
+        'yatube_template_warmup_templates',
+        'Шаблоны, скомпилированные при старте воркера.', compiled)
+    return {'templates': compiled, 'errors': errors, 'seconds': seconds}
+
+
+def warm_up():
+    """Прогрев воркера перед приёмом трафика (вызывается из wsgi.py)."""
+    if not settings.TEMPLATE_WARMUP:
+        return None
+    stats = warm_up_templates()
+    logger.info(
+        'Прогрев шаблонов: %(templates)s за %(seconds).3f с, '
+        'ошибок %(errors)s', stats)
+    return stats
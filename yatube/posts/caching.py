@@ -0,0 +1,259 @@
+import hashlib
+import time
+from calendar import timegm
+from functools import wraps
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.utils import make_template_fragment_key
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers,
+)
+from django.utils.http import http_date, quote_etag
+
+from core.cache import get_or_compute
+from core.routers import use_primary
+
+POST_CARD = 'post_card'
+POST_CARD_VARIANTS = ('feed', 'group', 'profile')
+
+# Сколько постов сбрасывается одним delete_many.
+CARD_CHUNK = 500
+
+FEED_VERSION_KEY = 'posts:feed:version'
+
+FEED_BUMPED_KEY = 'posts:feed:bumped'
+
+INDEX_FEED = 'index'
+
+
+def post_card_key(post_id, pub_date, variant, ready):
+    """Ключ фрагментного кэша карточки поста.
+
+    Карточка с заглушкой и карточка с готовыми вариантами картинки
+    кэшируются под разными ключами.
+    """
+    return make_template_fragment_key(
+        POST_CARD, [post_id, pub_date.isoformat(), variant, ready])
+
+
+def post_card_keys(post_id, pub_date):
+    """Ключи карточки поста во всех вариантах ленты."""
+    return [
+        post_card_key(post_id, pub_date, variant, ready)
+        for variant in POST_CARD_VARIANTS
+        for ready in (False, True)
+    ]
+
+
+def invalidate_post_card(post):
+    cache.delete_many(post_card_keys(post.pk, post.pub_date))
+
+
+def invalidate_post_cards(rows):
+    """Сбрасывает карточки постов по парам (pk, pub_date), например
+    всех постов автора после смены имени или группы после смены
+    названия.
+    """
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, CARD_CHUNK))
+        if not chunk:
+            return
+        cache.delete_many([
+            key for pk, pub_date in chunk
+            for key in post_card_keys(pk, pub_date)
+        ])
+
+
+def group_feed(slug):
+    return f'group:{slug}'
+
+
+def author_feed(username):
+    return f'author:{username}'
+
+
+def feed_timeout():
+    """Время жизни страниц и состояний лент.
+
+    Поколения лент хранятся в default-кэше. LocMemCache у каждого
+    воркера свой: запись в одном воркере не сдвигает поколение в
+    других, и те отдают старые страницы до истечения срока. Поэтому
+    без общего кэша срок короткий — TIME_CACHE_LOCAL.
+    """
+    if isinstance(caches['default'], LocMemCache):
+        return settings.TIME_CACHE_LOCAL
+    return settings.TIME_CACHE
+
+
+def get_feed_version(*feeds):
+    """Текущее поколение кэша лент feeds (по умолчанию главной).
+
+    Складывается из общего поколения, которое сдвигают массовые
+    операции, и поколений самих лент. Начальные значения берутся от
+    времени, чтобы после вытеснения ключа не подхватить страницы
+    прошлых поколений.
+    """
+    keys = [FEED_VERSION_KEY] + [
+        f'{FEED_VERSION_KEY}:{feed}' for feed in feeds or (INDEX_FEED,)]
+    versions = cache.get_many(keys)
+    if len(versions) < len(keys):
+        for key in keys:
+            if key not in versions:
+                cache.add(key, int(time.time() * 1000), None)
+        versions = cache.get_many(keys)
+    return '.'.join(str(versions.get(key, 0)) for key in keys)
+
+
+def bump_feed_version(*feeds):
+    """Сдвигает поколения лент feeds, без аргументов — всех лент."""
+    keys = [f'{FEED_VERSION_KEY}:{feed}' for feed in feeds] or [
+        FEED_VERSION_KEY]
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, int(time.time() * 1000), None)
+    if settings.DATABASE_REPLICAS:
+        cache.set_many(
+            {key.replace(FEED_VERSION_KEY, FEED_BUMPED_KEY): True
+             for key in keys},
+            settings.REPLICA_PIN_SECONDS)
+
+
+def recently_bumped(feed):
+    """Сдвигалось ли поколение ленты за последние REPLICA_PIN_SECONDS."""
+    return bool(cache.get_many(
+        [FEED_BUMPED_KEY, f'{FEED_BUMPED_KEY}:{feed}']))
+
+
+def fill_from_primary(feed, compute):
+    """compute, который сразу после сдвига поколения читает основную базу.
+
+    Реплика могла ещё не догнать запись, сдвинувшую поколение, а
+    посчитанное значение хранится под новым поколением весь срок
+    кэша. Пока не прошло REPLICA_PIN_SECONDS, кэш заполняется из
+    основной базы.
+    """
+    def fill():
+        if settings.DATABASE_REPLICAS and recently_bumped(feed):
+            with use_primary():
+                return compute()
+        return compute()
+    return fill
+
+
+def post_feeds(post):
+    """Ленты, где показывается пост: главная, профиль автора и группа
+    (до и после правки).
+    """
+    from .models import Group
+
+    feeds = [INDEX_FEED, author_feed(post.author.username)]
+    group_ids = {post.group_id, getattr(post, '_old_group_id', None)}
+    group_ids.discard(None)
+    if group_ids:
+        feeds += [
+            group_feed(slug) for slug in Group.objects.filter(
+                pk__in=group_ids).values_list('slug', flat=True)
+        ]
+    return feeds
+
+
+def feed_page_key(request, feed):
+    """Ключ страницы ленты: поколение, адрес и вариант пользователя."""
+    user = request.user
+    variant = user.pk if user.is_authenticated else 'anon'
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    version = get_feed_version(feed)
+    return f'posts:feed:{feed}:{version}:{variant}:{path}'
+
+
+def cache_feed(feed_of):
+    """Кэширует GET-ответ ленты до смены её поколения.
+
+    feed_of(*args, **kwargs) возвращает имя ленты по аргументам вьюхи.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            feed = feed_of(*args, **kwargs)
+            return get_or_compute(
+                feed_page_key(request, feed),
+                fill_from_primary(
+                    feed, lambda: view(request, *args, **kwargs)),
+                feed_timeout(),
+                cacheable=lambda response: response.status_code == 200,
+            )
+        return wrapper
+    return decorator
+
+
+def feed_state(feed, name, compute):
+    """Значение, которое меняется только вместе с поколением ленты.
+
+    Например, дата самого свежего поста: новый, изменённый или
+    удалённый пост сдвигает поколение своих лент, поэтому до этого
+    момента значение берётся из кэша без запроса к базе. Возвращает
+    пару (значение, поколение) — её ждёт conditional_page.
+    """
+    version = get_feed_version(feed)
+    value = get_or_compute(
+        f'posts:feed:{feed}:{version}:state:{name}',
+        fill_from_primary(feed, compute), feed_timeout())
+    return value, version
+
+
+def page_etag(request, last_modified, state):
+    """ETag страницы: дата, состояние (с поколением ленты) и вариант
+    пользователя (вместе с CSRF-кукой, которая попадает в формы).
+    """
+    user = request.user
+    variant = user.pk if user.is_authenticated else 'anon'
+    csrf = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+    raw = f'{last_modified}:{state}:{variant}:{csrf}'
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+def conditional_page(page_state, max_age=0):
+    """Conditional GET для HTML-страницы.
+
+    page_state(request, *args, **kwargs) дешёвым запросом или из кэша
+    возвращает (дата последнего изменения, состояние); в состояние
+    входит поколение ленты, чтобы правка поста меняла ETag. Если
+    валидаторы клиента совпали, ответ 304 отдаётся до вызова вьюхи
+    и рендеринга шаблона. Страницы гостей можно хранить общим кэшем,
+    страницы пользователей — только браузеру; те и другие различаются
+    по Cookie.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            last_modified, state = page_state(request, *args, **kwargs)
+            etag = page_etag(request, last_modified, state)
+            timestamp = (timegm(last_modified.utctimetuple())
+                         if last_modified else None)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+            private = request.user.is_authenticated
+            patch_cache_control(
+                response, max_age=max_age,
+                **{'private' if private else 'public': True})
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,86 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from core.routers import untracked_writes
+
+from .models import Post, PostCounter
+
+ALL_POSTS = 'all'
+
+
+def group_key(group_id):
+    return f'group:{group_id}'
+
+
+def author_key(author_id):
+    return f'author:{author_id}'
+
+
+def post_keys(post):
+    """Ключи всех счётчиков, в которые входит пост."""
+    keys = [ALL_POSTS, author_key(post.author_id)]
+    if post.group_id is not None:
+        keys.append(group_key(post.group_id))
+    return keys
+
+
+def get_count(key, queryset):
+    """Число постов по счётчику; отсутствующий счётчик считается по базе.
+
+    Создание счётчика — служебная запись и не закрепляет читателя за
+    основной базой.
+    """
+    value = PostCounter.objects.filter(key=key).values_list(
+        'value', flat=True).first()
+    if value is not None:
+        return value
+    value = queryset.count()
+    try:
+        with untracked_writes(), transaction.atomic():
+            PostCounter.objects.create(key=key, value=value)
+    except IntegrityError:
+        pass
+    return value
+
+
+def change_counts(keys, delta):
+    PostCounter.objects.filter(key__in=keys).update(value=F('value') + delta)
+
+
+def count_all():
+    """Точные значения всех счётчиков, посчитанные агрегатами."""
+    counts = {ALL_POSTS: Post.objects.count()}
+    by_author = Post.objects.order_by().values_list('author').annotate(
+        total=Count('pk'))
+    counts.update(
+        (author_key(author_id), total) for author_id, total in by_author
+    )
+    by_group = Post.objects.filter(group__isnull=False).order_by()
+    by_group = by_group.values_list('group').annotate(total=Count('pk'))
+    counts.update(
+        (group_key(group_id), total) for group_id, total in by_group
+    )
+    return counts
+
+
+@transaction.atomic
+def reconcile():
+    """Приводит счётчики к точным значениям.
+
+    Возвращает число исправленных, созданных и удалённых счётчиков.
+    """
+    counts = count_all()
+    fixed = removed = 0
+    for counter in PostCounter.objects.select_for_update():
+        value = counts.pop(counter.key, None)
+        if value is None:
+            counter.delete()
+            removed += 1
+        elif value != counter.value:
+            counter.value = value
+            counter.save(update_fields=('value',))
+            fixed += 1
+    PostCounter.objects.bulk_create(
+        PostCounter(key=key, value=value) for key, value in counts.items()
+    )
+    return fixed, len(counts), removed
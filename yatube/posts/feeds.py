@@ -0,0 +1,199 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count
+
+from core.cache import get_or_compute
+
+from .models import FeedEntry, Follow, Post
+from .paginators import CursorPaginator, keyset
+
+CELEBRITIES_KEY = 'posts:feed:celebrities'
+
+
+def batch_size():
+    """FEED_BATCH_SIZE, но не больше, чем бэкенд вставит за раз.
+
+    Django 2.2 не урезает явный batch_size, а SQLite не принимает
+    больше 500 строк в одном INSERT ... SELECT UNION ALL.
+    """
+    fields = [FeedEntry._meta.get_field(name)
+              for name in ('user', 'post', 'pub_date')]
+    return min(settings.FEED_BATCH_SIZE,
+               connection.ops.bulk_batch_size(fields, []))
+
+
+def get_celebrity_ids():
+    """Авторы, у которых подписчиков больше FEED_FANOUT_LIMIT.
+
+    Их посты не раскладываются по лентам, а подмешиваются при чтении.
+    """
+    def collect():
+        authors = Follow.objects.order_by().values('author').annotate(
+            followers=Count('pk')).filter(
+            followers__gt=settings.FEED_FANOUT_LIMIT)
+        return frozenset(author['author'] for author in authors)
+    return get_or_compute(
+        CELEBRITIES_KEY, collect, settings.FEED_CELEBRITIES_TIMEOUT)
+
+
+def is_celebrity(author_id):
+    followers = Follow.objects.filter(author_id=author_id).count()
+    return followers > settings.FEED_FANOUT_LIMIT
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    limit = settings.FEED_FANOUT_LIMIT
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    followers = list(followers[:limit + 1])
+    if len(followers) > limit:
+        if post.author_id not in get_celebrity_ids():
+            cache.delete(CELEBRITIES_KEY)
+        return
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+         for user_id in followers),
+        batch_size=batch_size(),
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту пользователя уже опубликованные посты автора.
+
+    Посты знаменитости не копируются: их подмешивает чтение ленты,
+    поэтому подписка, переводящая автора через FEED_FANOUT_LIMIT,
+    сбрасывает закэшированный набор знаменитостей.
+    """
+    if is_celebrity(author_id):
+        if author_id not in get_celebrity_ids():
+            cache.delete(CELEBRITIES_KEY)
+        return
+    posts = Post.objects.filter(author_id=author_id).order_by().values_list(
+        'pk', 'pub_date')
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+         for pk, pub_date in posts.iterator()),
+        batch_size=batch_size(),
+        ignore_conflicts=True,
+    )
+
+
+def unfill(user_id, author_id):
+    """Убирает из ленты пользователя посты автора."""
+    FeedEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id).delete()
+    restore(author_id)
+
+
+def restore(author_id):
+    """Дописывает ленты, пропущенные, пока автор был знаменитостью.
+
+    Посты знаменитости и подписки на неё лент не пополняют. Когда
+    подписчиков становится не больше FEED_FANOUT_LIMIT, такие ленты
+    узнаются по отсутствию записи о последнем посте автора и
+    дополняются целиком. Возвращает число дописанных лент.
+    """
+    if is_celebrity(author_id):
+        return 0
+    latest = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-pk').values_list('pk', flat=True).first()
+    if latest is None:
+        return 0
+    missing = list(Follow.objects.filter(author_id=author_id).exclude(
+        user_id__in=FeedEntry.objects.filter(
+            post_id=latest).values('user_id')).values_list(
+        'user_id', flat=True))
+    for user_id in missing:
+        backfill(user_id, author_id)
+    if missing:
+        cache.delete(CELEBRITIES_KEY)
+    return len(missing)
+
+
+def rebuild(user=None):
+    """Пересобирает ленты по таблице подписок.
+
+    Записи вставляются одним INSERT ... SELECT из соединения подписок
+    и постов, без знаменитостей. Возвращает число записей в лентах.
+    """
+    entries = FeedEntry.objects.all()
+    condition = ''
+    params = [settings.FEED_FANOUT_LIMIT]
+    if user is not None:
+        entries = entries.filter(user=user)
+        condition = ' AND follow.user_id = %s'
+        params.append(user.pk)
+    follows = Follow._meta.db_table
+    with transaction.atomic():
+        entries.delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {FeedEntry._meta.db_table} '
+                f'(user_id, post_id, pub_date) '
+                f'SELECT follow.user_id, post.id, post.pub_date '
+                f'FROM {follows} follow '
+                f'INNER JOIN {Post._meta.db_table} post '
+                f'ON post.author_id = follow.author_id '
+                f'WHERE follow.author_id NOT IN ('
+                f'SELECT author_id FROM {follows} GROUP BY author_id '
+                f'HAVING COUNT(*) > %s){condition}',
+                params)
+            total = cursor.rowcount
+    cache.delete(CELEBRITIES_KEY)
+    return total
+
+
+def followed_celebrities(user):
+    """Знаменитости, на которых подписан пользователь."""
+    celebrities = get_celebrity_ids()
+    if not celebrities:
+        return []
+    return list(Follow.objects.filter(
+        user=user, author_id__in=celebrities).values_list(
+        'author_id', flat=True))
+
+
+class FollowFeedPaginator(CursorPaginator):
+    """Курсорная пагинация ленты подписок.
+
+    Материализованная часть читается из FeedEntry по индексу
+    (user, pub_date, post), посты знаменитостей — отдельным
+    ограниченным запросом на каждого автора по индексу
+    (author, pub_date, id). Ключи сливаются в памяти, посты страницы
+    загружаются из object_list одним запросом.
+    """
+
+    def __init__(self, object_list, per_page, user, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.user = user
+        self._celebrities = None
+
+    def sources(self):
+        if self._celebrities is None:
+            self._celebrities = followed_celebrities(self.user)
+        yield FeedEntry.objects.filter(user=self.user), 'post_id'
+        for author_id in self._celebrities:
+            yield Post.objects.filter(author_id=author_id), 'pk'
+
+    def keys(self, after=None, before=None, limit=None):
+        keys = {}
+        for queryset, pk in self.sources():
+            rows = keyset(queryset, after, before, pk).values_list(
+                pk, 'pub_date')
+            keys.update(rows[:limit])
+        ordered = sorted(
+            ((pub_date, pk) for pk, pub_date in keys.items()),
+            reverse=before is None)
+        return ordered[:limit]
+
+    def fetch(self, after=None, before=None, limit=None):
+        keys = self.keys(after, before, limit)
+        posts = self.object_list.in_bulk([pk for _, pk in keys])
+        return [posts[pk] for _, pk in keys if pk in posts]
+
+    def latest(self):
+        keys = self.keys(limit=1)
+        return keys[0][0] if keys else None
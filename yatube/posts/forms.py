@@ -1,6 +1,14 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
+from django.template.defaultfilters import filesizeformat
+from django.utils.formats import number_format
 
 from .models import Post, Comment
+from .uploads import OversizedUploadedFile, downscale_image
 
 
 class PostForm(ModelForm):
@@ -14,6 +22,46 @@ class PostForm(ModelForm):
                       'image': 'Загрузите картинку'}
         fields = ['text', 'group', 'image']
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Оборванную обработчиком загрузку не отдаём Pillow на проверку.
+        name = self.add_prefix('image')
+        self.oversized_image = isinstance(
+            self.files.get(name), OversizedUploadedFile)
+        if self.oversized_image:
+            self.files = self.files.copy()
+            del self.files[name]
+
+    def clean_image(self):
+        """Лимиты на размер файла и разрешение новой картинки.
+
+        Разрешение берётся из заголовка, который уже прочитала проверка
+        ImageField, — до полного декодирования растра.
+        """
+        image = self.cleaned_data.get('image')
+        max_size = settings.POST_IMAGE_MAX_UPLOAD_SIZE
+        if self.oversized_image or (
+                isinstance(image, UploadedFile) and image.size > max_size):
+            raise ValidationError(
+                'Файл больше %(limit)s.',
+                code='file_too_large',
+                params={'limit': filesizeformat(max_size)},
+            )
+        if not isinstance(image, UploadedFile):
+            return image
+        width, height = image.image.size
+        max_pixels = settings.POST_IMAGE_MAX_PIXELS
+        if width * height > max_pixels:
+            raise ValidationError(
+                'Картинка больше %(limit)s мегапикселей.',
+                code='too_many_pixels',
+                params={
+                    'limit': number_format(Decimal(max_pixels) / 10 ** 6)},
+            )
+        if max(width, height) > settings.POST_IMAGE_MAX_SIDE:
+            return downscale_image(image, settings.POST_IMAGE_MAX_SIDE)
+        return image
+
 
 class CommentForm(ModelForm):
     class Meta:
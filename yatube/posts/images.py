@@ -0,0 +1,397 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from io import BytesIO
+
+from PIL import Image, ImageOps, features
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from core.cache import hold_lock
+
+logger = logging.getLogger(__name__)
+
+VARIANTS_DIR = 'posts/variants'
+
+_executor = None
+# Картинки в очереди на нарезку и посты, которые ждут их вариантов.
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+def get_formats():
+    """Форматы вариантов: JPEG всегда, WebP — если его умеет Pillow."""
+    formats = [('jpeg', 'JPEG', 'jpg')]
+    if features.check('webp'):
+        formats.append(('webp', 'WEBP', 'webp'))
+    return formats
+
+
+def get_widths(source_width):
+    """Ширины вариантов не больше исходной, но хотя бы одна."""
+    widths = sorted(settings.POST_IMAGE_WIDTHS)
+    return [width for width in widths if width <= source_width] or widths[:1]
+
+
+def source_exists(image):
+    try:
+        return image.storage.exists(image.name)
+    except (SuspiciousFileOperation, OSError):
+        return False
+
+
+def build_variants(name):
+    """Нарезает варианты картинки и возвращает их описание.
+
+    Работает только с файлами, без обращения к базе, поэтому
+    выполняется в отдельном процессе.
+    """
+    with default_storage.open(name) as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image).convert('RGB')
+    ratio_width, ratio_height = settings.POST_IMAGE_RATIO
+    stem = os.path.splitext(os.path.basename(name))[0]
+    variants = []
+    for width in get_widths(image.width):
+        height = round(width * ratio_height / ratio_width)
+        resized = ImageOps.fit(image, (width, height), Image.LANCZOS)
+        for code, pillow_format, extension in get_formats():
+            buffer = BytesIO()
+            resized.save(
+                buffer, pillow_format,
+                quality=settings.POST_IMAGE_QUALITY, optimize=True)
+            saved = default_storage.save(
+                f'{VARIANTS_DIR}/{stem}_{width}.{extension}',
+                ContentFile(buffer.getvalue()))
+            variants.append({
+                'image': saved,
+                'format': code,
+                'width': width,
+                'height': height,
+            })
+    return variants
+
+
+def generate_variants(name):
+    """Задача фонового процесса."""
+    try:
+        return build_variants(name)
+    except Exception:
+        logger.exception('Не удалось нарезать картинку %s', name)
+        return None
+
+
+def count_references(name):
+    """Сколько строк базы ссылается на файл хранилища."""
+    from .models import Post, PostImageVariant
+
+    return (Post.objects.filter(image=name).count()
+            + PostImageVariant.objects.filter(image=name).count())
+
+
+def release_file(name):
+    """Удаляет файл, если на него больше не ссылается ни одна строка.
+
+    Одинаковые картинки хранятся одним файлом, поэтому счётчик ссылок
+    считается по базе, а не хранится отдельно и не может разойтись
+    с ней. Под замком файла ссылки пересчитываются: загрузка того же
+    содержимого могла найти файл и ещё не записать ссылку (см.
+    ContentAddressedStorage). Оставшийся файл подберёт collect_media.
+    """
+    from .storage import file_lock_key, is_claimed
+
+    if not name or count_references(name):
+        return
+    with hold_lock(file_lock_key(name)) as locked:
+        if not locked or is_claimed(name) or count_references(name):
+            return
+        try:
+            default_storage.delete(name)
+        except SuspiciousFileOperation:
+            # Путь вне MEDIA_ROOT — это не файл хранилища.
+            logger.warning('Файл %s вне хранилища, не удаляем', name)
+
+
+def save_variants(post_id, name, variants):
+    """Сохраняет варианты, если у поста всё ещё та же картинка."""
+    from .caching import bump_feed_version, post_feeds
+    from .models import Post, PostImageVariant
+    from .storage import release_claims
+
+    if not variants:
+        return
+    new_names = [variant['image'] for variant in variants]
+    with transaction.atomic():
+        if not Post.objects.filter(pk=post_id, image=name).exists():
+            released = new_names
+        else:
+            stale = PostImageVariant.objects.filter(post_id=post_id)
+            released = list(stale.values_list('image', flat=True))
+            stale.delete()
+            PostImageVariant.objects.bulk_create(
+                PostImageVariant(post_id=post_id, source=name, **variant)
+                for variant in variants
+            )
+    release_claims(new_names)
+    for stale_name in set(released):
+        release_file(stale_name)
+    post = Post.objects.select_related('author').filter(pk=post_id).first()
+    if post is not None:
+        bump_feed_version(*post_feeds(post))
+
+
+def reuse_variants(post_id, name):
+    """Берёт готовые варианты той же картинки у другого поста.
+
+    Одинаковые картинки хранятся под одним именем, поэтому повторно
+    загруженную картинку не нужно нарезать заново.
+    """
+    from .models import PostImageVariant
+
+    donor = PostImageVariant.objects.filter(source=name).exclude(
+        post_id=post_id).values_list('post_id', flat=True).first()
+    if donor is None:
+        return False
+    variants = list(PostImageVariant.objects.filter(
+        post_id=donor, source=name).values('image', 'format', 'width',
+                                           'height'))
+    save_variants(post_id, name, variants)
+    return True
+
+
+def rehash_media(dry_run=False):
+    """Переносит файлы, сохранённые до хранилища по хэшу, под их хэш.
+
+    Одинаковые старые файлы сходятся в один, ссылки в базе
+    переписываются. Возвращает число перенесённых файлов.
+    """
+    from .models import Post, PostImageVariant
+    from .storage import is_hashed, release_claims
+
+    names = set(Post.objects.exclude(image='').values_list(
+        'image', flat=True))
+    names.update(PostImageVariant.objects.values_list('image', flat=True))
+    moved = 0
+    for name in sorted(names):
+        if is_hashed(name) or not default_storage.exists(name):
+            continue
+        moved += 1
+        if dry_run:
+            continue
+        with default_storage.open(name) as content:
+            new_name = default_storage.save(name, content)
+        with transaction.atomic():
+            Post.objects.filter(image=name).update(image=new_name)
+            PostImageVariant.objects.filter(image=name).update(
+                image=new_name)
+            PostImageVariant.objects.filter(source=name).update(
+                source=new_name)
+        release_claims([new_name])
+    return moved
+
+
+def iter_media(directory):
+    """Все файлы каталога хранилища, рекурсивно."""
+    if not default_storage.exists(directory):
+        return
+    directories, files = default_storage.listdir(directory)
+    for filename in files:
+        yield f'{directory}/{filename}'
+    for subdirectory in directories:
+        yield from iter_media(f'{directory}/{subdirectory}')
+
+
+def collect_garbage(grace=None, dry_run=False):
+    """Удаляет файлы медиа, на которые не ссылается ни одна строка.
+
+    Файлы моложе grace секунд не трогаются: их загрузка могла ещё не
+    дойти до базы. То же со старыми файлами, которые только что нашла
+    загрузка того же содержимого. Возвращает число удалённых файлов
+    и их объём.
+    """
+    from .models import Post, PostImageVariant
+    from .storage import is_claimed
+
+    if grace is None:
+        grace = settings.MEDIA_GC_GRACE
+    referenced = set(Post.objects.values_list('image', flat=True))
+    referenced.update(
+        PostImageVariant.objects.values_list('image', flat=True))
+    threshold = timezone.now() - timedelta(seconds=grace)
+    removed = freed = 0
+    for directory in settings.MEDIA_GC_DIRS:
+        for name in iter_media(directory):
+            if name in referenced:
+                continue
+            if default_storage.get_modified_time(name) > threshold:
+                continue
+            if is_claimed(name):
+                continue
+            removed += 1
+            freed += default_storage.size(name)
+            if not dry_run:
+                release_file(name)
+    return removed, freed
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.POST_IMAGE_WORKERS,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+        )
+    return _executor
+
+
+def reset_executor():
+    """Забывает сломанный пул, следующая задача поднимет новый."""
+    global _executor
+    _executor = None
+
+
+def schedule_variants(post_id, name):
+    """Ставит нарезку в очередь; без воркеров режет сразу."""
+    if not settings.POST_IMAGE_WORKERS:
+        save_variants(post_id, name, generate_variants(name))
+        return
+    with _pending_lock:
+        waiting = name in _pending
+        _pending.setdefault(name, set()).add(post_id)
+    if waiting:
+        return
+
+    def done(future):
+        with _pending_lock:
+            post_ids = _pending.pop(name, set())
+        if future.exception() is not None:
+            if isinstance(future.exception(), BrokenProcessPool):
+                reset_executor()
+            logger.error('Пул нарезки картинок упал на %s', name,
+                         exc_info=future.exception())
+            return
+        for waiting_post_id in post_ids:
+            save_variants(waiting_post_id, name, future.result())
+
+    try:
+        future = get_executor().submit(generate_variants, name)
+    except BrokenProcessPool:
+        reset_executor()
+        future = get_executor().submit(generate_variants, name)
+    future.add_done_callback(done)
+
+
+def request_variants(post):
+    """Ставит в очередь нарезку картинки, у которой нет вариантов.
+
+    Вызывается при показе поста. Так варианты появляются у картинок,
+    загруженных до миграции 0010, у постов из import_posts (bulk_create
+    без сигналов) и у задач, потерянных упавшим пулом. Повтор для
+    одного файла — не чаще раза в POST_IMAGE_RETRY_TIMEOUT.
+    """
+    name = post.image.name
+    if not cache.add(
+            f'posts:variants:requested:{name}', 1,
+            settings.POST_IMAGE_RETRY_TIMEOUT):
+        return
+    if not source_exists(post.image):
+        return
+    post_id = post.pk
+    transaction.on_commit(
+        lambda: reuse_variants(post_id, name)
+        or schedule_variants(post_id, name))
+
+
+def posts_without_variants():
+    """Посты, у текущей картинки которых нет вариантов."""
+    from .models import Post, PostImageVariant
+
+    ready = PostImageVariant.objects.filter(
+        post=OuterRef('pk'), source=OuterRef('image'))
+    return Post.objects.exclude(image='').annotate(
+        ready=Exists(ready)).filter(ready=False)
+
+
+def regenerate_variants(posts, force=False):
+    """Нарезает варианты картинок постов в текущем процессе.
+
+    Без force сначала берёт готовые варианты того же файла у другого
+    поста. Возвращает число нарезанных, взятых готовыми, пропущенных
+    (файла нет) и упавших картинок.
+    """
+    stats = {'generated': 0, 'reused': 0, 'missing': 0, 'failed': 0}
+    for post in posts.order_by('pk').only('pk', 'image').iterator():
+        name = post.image.name
+        if not source_exists(post.image):
+            stats['missing'] += 1
+        elif not force and reuse_variants(post.pk, name):
+            stats['reused'] += 1
+        else:
+            variants = generate_variants(name)
+            save_variants(post.pk, name, variants)
+            stats['generated' if variants else 'failed'] += 1
+    return stats
+
+
+class Picture:
+    """Готовые варианты картинки поста для тега <picture>.
+
+    Пока вариантов нет, показывается исходный файл, а нарезка
+    ставится в очередь.
+    """
+    SIZES = '(max-width: 960px) 100vw, 960px'
+
+    def __init__(self, post):
+        name = post.image.name
+        self.exists = bool(name)
+        self.variants = [
+            variant for variant in post.image_variants.all()
+            if variant.source == name
+        ] if self.exists else []
+        self.ready = bool(self.variants)
+        self.url = post.image.url if self.exists else None
+        if self.exists and not self.ready:
+            request_variants(post)
+
+    def srcset(self, code):
+        return ', '.join(
+            f'{variant.image.url} {variant.width}w'
+            for variant in self.variants if variant.format == code
+        )
+
+    @property
+    def webp_srcset(self):
+        return self.srcset('webp')
+
+    @property
+    def jpeg_srcset(self):
+        return self.srcset('jpeg')
+
+    @property
+    def fallback(self):
+        """JPEG ближайшей к карточке ширины для src, width и height."""
+        jpegs = [
+            variant for variant in self.variants if variant.format == 'jpeg'
+        ]
+        if not jpegs:
+            return None
+        card_width = settings.POST_IMAGE_RATIO[0]
+        fitting = [variant for variant in jpegs if variant.width <= card_width]
+        return fitting[-1] if fitting else jpegs[0]
@@ -0,0 +1,116 @@
+import itertools
+import json
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import override_settings
+from django.urls import reverse
+
+from core import benchmark
+from core.db import get_pragmas
+from posts.models import Post, User
+
+from .benchmark_views import default_endpoints
+
+# Настройки SQLite по умолчанию: журнал отката и полная синхронизация.
+BASELINE_PRAGMAS = {
+    'journal_mode': 'DELETE',
+    'synchronous': 'FULL',
+}
+
+
+def reader(endpoints):
+    def factory():
+        clients = {
+            username: benchmark.make_client(username)
+            for _, _, username in endpoints
+        }
+        urls = itertools.cycle(endpoints)
+
+        def read():
+            _, url, username = next(urls)
+            return clients[username].get(url).status_code == 200
+        return read
+    return factory
+
+
+def writer(user, post_ids, seed):
+    def factory():
+        client = benchmark.make_client(user.username)
+        rng = random.Random(seed)
+        counter = itertools.count()
+
+        def write():
+            if next(counter) % 2:
+                response = client.post(
+                    reverse('posts:post_create'),
+                    {'text': 'Нагрузочный пост'})
+            else:
+                response = client.post(
+                    reverse('posts:add_comment',
+                            args=(rng.choice(post_ids),)),
+                    {'text': 'Нагрузочный комментарий'})
+            return response.status_code == 302
+        return write
+    return factory
+
+
+class Command(BaseCommand):
+    help = ('Читает ленты в нескольких потоках, пока другие потоки '
+            'пишут комментарии и посты, и меряет пропускную способность.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--duration', type=float, default=10)
+        parser.add_argument(
+            '--user', help='Пользователь для ленты подписок и записи.')
+        parser.add_argument(
+            '--baseline', action='store_true',
+            help='Без WAL и постоянных соединений, для сравнения.')
+        parser.add_argument('--json', help='Сохранить результаты в файл.')
+
+    def handle(self, *args, **options):
+        endpoints = default_endpoints(options['user'])
+        author = (User.objects.get(username=options['user'])
+                  if options['user'] else User.objects.first())
+        post_ids = list(Post.objects.values_list('pk', flat=True)[:1000])
+        if author is None or not post_ids:
+            raise CommandError('Нет данных, запустите generate_data')
+        workers = [
+            ('read', reader(endpoints)) for _ in range(options['readers'])
+        ] + [
+            ('write', writer(author, post_ids, seed))
+            for seed in range(options['writers'])
+        ]
+        if options['baseline']:
+            database = connections.databases['default']
+            conn_max_age = database['CONN_MAX_AGE']
+            database['CONN_MAX_AGE'] = 0
+            try:
+                with override_settings(SQLITE_PRAGMAS=BASELINE_PRAGMAS):
+                    results = self.run(workers, options['duration'])
+            finally:
+                database['CONN_MAX_AGE'] = conn_max_age
+                connections.close_all()
+        else:
+            results = self.run(workers, options['duration'])
+        for kind, stats in results.items():
+            self.stdout.write(
+                f'{kind:<6} ops/s={stats["ops_per_second"]:8.1f} '
+                f'p50={stats["p50_ms"]:8.2f}ms '
+                f'p95={stats["p95_ms"]:8.2f}ms '
+                f'p99={stats["p99_ms"]:8.2f}ms '
+                f'errors={stats["errors"]}'
+            )
+        if options['json']:
+            with open(options['json'], 'w') as target:
+                json.dump(results, target, indent=2)
+
+    def run(self, workers, duration):
+        connections.close_all()
+        pragmas = get_pragmas(connections['default'])
+        self.stdout.write(' '.join(
+            f'{name}={value}' for name, value in pragmas.items()))
+        return benchmark.run_concurrent(workers, duration)
@@ -0,0 +1,121 @@
+import json
+import platform
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.urls import reverse
+from django.utils import timezone
+
+from core import benchmark
+from posts.models import Comment, Follow, Group, Post, User
+from posts.paginators import encode_cursor
+
+
+def default_endpoints(username=None):
+    """Ленты с самыми тяжёлыми данными из текущей базы."""
+    endpoints = [('index', reverse('posts:index'), None)]
+    pages = Post.objects.count() // 10
+    if pages > 1:
+        endpoints.append((
+            'index_deep_page',
+            reverse('posts:index') + f'?page={pages // 2}',
+            None,
+        ))
+        middle = Post.objects.order_by('-pub_date', '-pk')[pages * 5]
+        endpoints.append((
+            'index_cursor',
+            reverse('posts:index') + f'?after={encode_cursor(middle)}',
+            None,
+        ))
+    group = Group.objects.annotate(total=Count('posts')).order_by(
+        '-total').first()
+    if group is not None:
+        endpoints.append((
+            'group_posts',
+            reverse('posts:group_list', args=(group.slug,)),
+            None,
+        ))
+    author = User.objects.annotate(total=Count('posts')).order_by(
+        '-total').first()
+    if author is not None:
+        endpoints.append((
+            'profile',
+            reverse('posts:profile', args=(author.username,)),
+            None,
+        ))
+    commented = Comment.objects.order_by().values('post').annotate(
+        total=Count('pk')).order_by('-total').first()
+    post_id = commented['post'] if commented else Post.objects.values_list(
+        'pk', flat=True).first()
+    if post_id is not None:
+        endpoints.append((
+            'post_detail',
+            reverse('posts:post_detail', args=(post_id,)),
+            None,
+        ))
+    if username is None:
+        follower = Follow.objects.order_by().values('user').annotate(
+            total=Count('pk')).order_by('-total').first()
+        if follower is not None:
+            username = User.objects.get(pk=follower['user']).username
+    if username is not None:
+        endpoints.append((
+            'follow_index', reverse('posts:follow_index'), username))
+    return endpoints
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный прогон лент через тестовый клиент: '
+            'p50/p95/p99, запросы к БД и пропускная способность.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100)
+        parser.add_argument('--warmup', type=int, default=1)
+        parser.add_argument(
+            '--user', help='Пользователь для ленты подписок.')
+        parser.add_argument(
+            '--only', nargs='+', help='Прогнать только эти страницы.')
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом.')
+        parser.add_argument('--json', help='Сохранить результаты в файл.')
+        parser.add_argument(
+            '--compare', help='Сравнить с результатами из JSON-файла.')
+
+    def handle(self, *args, **options):
+        endpoints = default_endpoints(options['user'])
+        if options['only']:
+            endpoints = [
+                endpoint for endpoint in endpoints
+                if endpoint[0] in options['only']
+            ]
+        if not endpoints:
+            raise CommandError('Нет страниц для прогона')
+        results = benchmark.run(
+            endpoints, options['requests'],
+            cold=options['cold'], warmup=options['warmup'])
+        for name, stats in results.items():
+            self.stdout.write(
+                f'{name:<16} p50={stats["p50_ms"]:8.2f}ms '
+                f'p95={stats["p95_ms"]:8.2f}ms '
+                f'p99={stats["p99_ms"]:8.2f}ms '
+                f'queries={stats["queries_per_request"]:5.1f} '
+                f'rps={stats["throughput_rps"]:8.1f}'
+            )
+        if options['compare']:
+            deltas = benchmark.compare(
+                results, benchmark.load(options['compare']))
+            for name, delta in deltas.items():
+                changes = ' '.join(
+                    f'{key}={value:+.1f}%' for key, value in delta.items())
+                self.stdout.write(f'{name:<16} {changes}')
+        if options['json']:
+            report = {
+                'created': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'requests': options['requests'],
+                'cold': options['cold'],
+                'endpoints': results,
+            }
+            with open(options['json'], 'w') as target:
+                json.dump(report, target, indent=2, ensure_ascii=False)
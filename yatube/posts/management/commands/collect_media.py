@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from posts import images
+
+
+class Command(BaseCommand):
+    help = ('Переносит старые файлы картинок в хранилище по хэшу '
+            'и удаляет файлы, на которые не ссылается база.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=int, default=None,
+            help='Не трогать файлы моложе стольких секунд.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет сделано.',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        moved = images.rehash_media(dry_run=dry_run)
+        removed, freed = images.collect_garbage(
+            grace=options['grace'], dry_run=dry_run)
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено: {moved}, удалено файлов: {removed}, '
+            f'освобождено байт: {freed}'
+        ))
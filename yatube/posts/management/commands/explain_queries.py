@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core import queryplan
+
+from .benchmark_views import default_endpoints
+
+
+class Command(BaseCommand):
+    help = ('Показывает EXPLAIN QUERY PLAN запросов каждой ленты '
+            'и падает, если какой-то запрос читает таблицу целиком.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', help='Пользователь для ленты подписок.')
+        parser.add_argument(
+            '--ignore', nargs='+', default=[],
+            help='Таблицы, полный проход по которым допустим.')
+        parser.add_argument(
+            '--verbose-plans', action='store_true',
+            help='Печатать SQL и план каждого запроса.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('EXPLAIN QUERY PLAN поддерживается '
+                               'только для SQLite')
+        flagged = 0
+        for name, url, username in default_endpoints(options['user']):
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{name}: {url}'))
+            for sql, plan in queryplan.capture_plans(url, username):
+                scans = [
+                    table for table in queryplan.full_scans(plan)
+                    if table not in options['ignore']
+                ]
+                if options['verbose_plans'] or scans:
+                    self.stdout.write(f'  {sql}')
+                    for line in plan:
+                        self.stdout.write(f'    {line}')
+                for table in scans:
+                    flagged += 1
+                    self.stdout.write(self.style.ERROR(
+                        f'  полный проход по {table}'))
+                for line in queryplan.temp_sorts(plan):
+                    self.stdout.write(self.style.WARNING(
+                        f'  сортировка без индекса: {line}'))
+        if flagged:
+            raise CommandError(f'Полных проходов по таблицам: {flagged}')
+        self.stdout.write(self.style.SUCCESS('Полных проходов нет'))
@@ -0,0 +1,54 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = ('Потоково выгружает группы, посты, комментарии и подписки '
+            'в NDJSON или CSV.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл или - для stdout.')
+        parser.add_argument(
+            '--format', choices=('ndjson', 'csv'), default=None,
+            help='По умолчанию — по расширению файла, иначе ndjson.')
+        parser.add_argument(
+            '--types', nargs='+', choices=transfer.TYPES,
+            default=list(transfer.TYPES))
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Дописать файл с места, где оборвался прошлый экспорт.')
+        parser.add_argument('--progress-every', type=int, default=100000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'ndjson')
+        after = None
+        if options['resume']:
+            if path == '-':
+                raise CommandError('--resume работает только с файлом')
+            after = transfer.resume_point(path, file_format)
+        stream = sys.stdout if path == '-' else open(
+            path, 'a' if after else 'w', newline='', encoding='utf-8')
+        try:
+            if file_format == 'csv':
+                writer = transfer.CsvWriter(stream, header=after is None)
+            else:
+                writer = transfer.NdjsonWriter(stream)
+            exported = 0
+            records = transfer.iter_records(
+                options['types'], after=after,
+                chunk_size=options['chunk_size'])
+            for record in records:
+                writer.write(record)
+                exported += 1
+                if exported % options['progress_every'] == 0:
+                    self.stderr.write(f'{record["type"]}: {exported}')
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+        self.stderr.write(self.style.SUCCESS(f'Выгружено записей: {exported}'))
@@ -0,0 +1,159 @@
+import random
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import counters, feeds, search
+from posts.caching import bump_feed_version
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+DEFAULT_PASSWORD = 'benchmark'
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def power_law_weights(count, exponent):
+    """Веса популярности по закону Ципфа: 1 / rank ** exponent."""
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+class Command(BaseCommand):
+    help = 'Генерирует большой синтетический набор данных для нагрузки.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=200000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок на пользователя.')
+        parser.add_argument(
+            '--exponent', type=float, default=1.1,
+            help='Показатель степенного распределения популярности.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prefix', default='bench')
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument(
+            '--skip-feeds', action='store_true',
+            help='Не пересобирать материализованные ленты подписок.')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        prefix = options['prefix']
+        user_ids = self.create_users(prefix, options['users'])
+        group_ids = self.create_groups(prefix, options['groups'])
+        weights = power_law_weights(len(user_ids), options['exponent'])
+        self.random.shuffle(user_ids)
+        cum_weights = []
+        total = 0
+        for weight in weights:
+            total += weight
+            cum_weights.append(total)
+        self.create_posts(
+            options['posts'], user_ids, cum_weights, group_ids)
+        self.create_follows(
+            options['follows'], user_ids, cum_weights)
+        self.create_comments(options['comments'], user_ids, prefix)
+        counters.reconcile()
+        search.rebuild()
+        bump_feed_version()
+        if not options['skip_feeds']:
+            self.stdout.write('Пересборка лент подписок...')
+            feeds.rebuild()
+        self.stdout.write(self.style.SUCCESS('Готово'))
+
+    def bulk_create(self, model, objects, total):
+        created = 0
+        for batch in batched(objects, self.batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(batch, ignore_conflicts=True)
+            created += len(batch)
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: {created}/{total}',
+                ending='\r')
+        self.stdout.write('')
+
+    def create_users(self, prefix, count):
+        password = make_password(DEFAULT_PASSWORD)
+        users = (
+            User(username=f'{prefix}_user_{number}', password=password)
+            for number in range(count)
+        )
+        self.bulk_create(User, users, count)
+        return list(User.objects.filter(
+            username__startswith=f'{prefix}_user_').values_list(
+            'pk', flat=True))
+
+    def create_groups(self, prefix, count):
+        groups = (
+            Group(
+                title=f'Группа {number}',
+                slug=f'{prefix}-group-{number}',
+                description=f'Сгенерированная группа {number}',
+            )
+            for number in range(count)
+        )
+        self.bulk_create(Group, groups, count)
+        return list(Group.objects.filter(
+            slug__startswith=f'{prefix}-group-').values_list(
+            'pk', flat=True))
+
+    def create_posts(self, count, user_ids, cum_weights, group_ids):
+        choose = self.random.choices
+        posts = (
+            Post(
+                text=f'Сгенерированный пост {number}',
+                author_id=choose(user_ids, cum_weights=cum_weights)[0],
+                group_id=(
+                    self.random.choice(group_ids)
+                    if group_ids and self.random.random() < 0.5 else None
+                ),
+            )
+            for number in range(count)
+        )
+        self.bulk_create(Post, posts, count)
+
+    def create_follows(self, average, user_ids, cum_weights):
+        """Подписки с популярностью авторов по степенному закону."""
+        def follows():
+            for user_id in user_ids:
+                wanted = min(
+                    int(self.random.expovariate(1 / average)) if average
+                    else 0,
+                    len(user_ids) - 1)
+                authors = set(self.random.choices(
+                    user_ids, cum_weights=cum_weights, k=wanted))
+                authors.discard(user_id)
+                for author_id in authors:
+                    yield Follow(user_id=user_id, author_id=author_id)
+        self.bulk_create(Follow, follows(), len(user_ids) * average)
+
+    def create_comments(self, count, user_ids, prefix):
+        post_ids = list(Post.objects.filter(
+            author__username__startswith=f'{prefix}_user_').values_list(
+            'pk', flat=True))
+        if not post_ids:
+            return
+        comments = (
+            Comment(
+                post_id=self.random.choice(post_ids),
+                author_id=self.random.choice(user_ids),
+                text=f'Сгенерированный комментарий {number}',
+            )
+            for number in range(count)
+        )
+        self.bulk_create(Comment, comments, count)
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from posts import images
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Нарезает варианты картинок постов, у которых их нет: '
+            'старые загрузки, импорт, потерянные задачи пула.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Перенарезать картинки всех постов.',
+        )
+
+    def handle(self, *args, **options):
+        if options['all']:
+            posts = Post.objects.exclude(image='')
+        else:
+            posts = images.posts_without_variants()
+        stats = images.regenerate_variants(posts, force=options['all'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Нарезано: {stats["generated"]}, взято готовых: '
+            f'{stats["reused"]}, нет файла: {stats["missing"]}, '
+            f'ошибок: {stats["failed"]}'
+        ))
@@ -0,0 +1,74 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import counters, feeds, search, transfer
+from posts.caching import bump_feed_version
+
+
+class Command(BaseCommand):
+    help = ('Потоково загружает группы, посты, комментарии и подписки '
+            'из NDJSON или CSV пачками bulk_create. id из файла '
+            'сохраняются, поэтому в базе не должно быть групп, постов, '
+            'комментариев и подписок — кроме продолжения прерванной '
+            'загрузки с --resume. Пользователи должны уже существовать.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл или - для stdin.')
+        parser.add_argument(
+            '--format', choices=('ndjson', 'csv'), default=None,
+            help='По умолчанию — по расширению файла, иначе ndjson.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить с последней закоммиченной пачки.')
+        parser.add_argument(
+            '--skip-rebuild', action='store_true',
+            help='Не пересчитывать счётчики, поиск и ленты после загрузки.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'ndjson')
+        checkpoint = None if path == '-' else f'{path}.progress'
+        skip = 0
+        if options['resume']:
+            if checkpoint is None:
+                raise CommandError('--resume работает только с файлом')
+            if os.path.exists(checkpoint):
+                with open(checkpoint) as source:
+                    skip = int(source.read().strip() or 0)
+        occupied = transfer.occupied_types()
+        if occupied and not skip:
+            raise CommandError(
+                'Импорт сохраняет id из файла и возможен только в пустую '
+                'базу, а в ней уже есть записи: ' + ', '.join(occupied))
+        stream = sys.stdin if path == '-' else open(
+            path, newline='', encoding='utf-8')
+
+        def save_progress(processed, record_type):
+            if checkpoint is not None:
+                with open(checkpoint, 'w') as target:
+                    target.write(str(processed))
+            self.stderr.write(f'{record_type}: {processed}')
+
+        try:
+            reader = (transfer.read_csv if file_format == 'csv'
+                      else transfer.read_ndjson)
+            processed = transfer.import_records(
+                reader(stream), batch_size=options['batch_size'],
+                skip=skip, on_batch=save_progress)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        transfer.reset_sequences()
+        if not options['skip_rebuild']:
+            counters.reconcile()
+            search.rebuild()
+            feeds.rebuild()
+        bump_feed_version()
+        if checkpoint is not None and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stderr.write(self.style.SUCCESS(
+            f'Обработано записей: {processed}'))
@@ -0,0 +1,28 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import feeds
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Пересобрать ленту только этого пользователя.',
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(
+                    f'Пользователь {options["user"]} не найден')
+        total = feeds.rebuild(user)
+        self.stdout.write(self.style.SUCCESS(
+            f'Записей в лентах: {total}'))
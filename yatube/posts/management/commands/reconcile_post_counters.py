@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счётчики постов с базой и исправляет расхождения.'
+
+    def handle(self, *args, **options):
+        fixed, created, removed = counters.reconcile()
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено: {fixed}, создано: {created}, удалено: {removed}'
+        ))
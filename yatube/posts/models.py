@@ -58,6 +58,16 @@ class Post(models.Model):
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:settings.COUNT_WORD]
@@ -85,6 +95,12 @@ class Comment(CreatedModel):
         ordering = ['-created']
         verbose_name = 'Комментарий '
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['post', '-created'],
+                name='comment_post_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text
@@ -109,3 +125,100 @@ class Follow(models.Model):
                 name='unique_follow'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx'
+            ),
+        ]
+
+
+class PostCounter(models.Model):
+    """Денормализованный счётчик постов ленты.
+
+    Поддерживается сигналами save/delete модели Post и сверяется
+    командой reconcile_post_counters.
+    """
+    key = models.CharField(
+        max_length=64,
+        unique=True,
+    )
+    value = models.IntegerField(
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'Счётчик постов'
+        verbose_name_plural = 'Счётчики постов'
+
+    def __str__(self):
+        return f'{self.key}: {self.value}'
+
+
+class FeedEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_feed_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='feed_user_pub_date_idx'
+            )
+        ]
+
+
+class PostImageVariant(models.Model):
+    """Уменьшенная копия картинки поста для адаптивной вёрстки."""
+    JPEG = 'jpeg'
+    WEBP = 'webp'
+    FORMATS = (
+        (JPEG, 'JPEG'),
+        (WEBP, 'WebP'),
+    )
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='image_variants',
+    )
+    source = models.CharField(
+        max_length=255,
+    )
+    image = models.FileField(
+        upload_to='posts/variants/',
+    )
+    format = models.CharField(
+        max_length=4,
+        choices=FORMATS,
+    )
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ('format', 'width')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'source', 'format', 'width'],
+                name='unique_image_variant'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.image.name} ({self.width}x{self.height})'
@@ -0,0 +1,175 @@
+import base64
+import binascii
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(post):
+    """Непрозрачный токен позиции поста в ленте: (pub_date, id)."""
+    raw = f'{post.pub_date.isoformat()}|{post.pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Разбирает токен курсора. Для битого токена возвращает None."""
+    if not token:
+        return None
+    try:
+        padding = '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(token + padding).decode()
+        pub_date, pk = raw.rsplit('|', 1)
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if pub_date is None:
+        return None
+    return pub_date, pk
+
+
+class CursorPage(Page):
+    """Страница курсорной пагинации.
+
+    Не знает своего номера и общего числа страниц, вместо этого
+    хранит токены соседних страниц.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, paginator,
+                 next_cursor=None, previous_cursor=None):
+        super().__init__(object_list, None, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+def keyset(queryset, after=None, before=None, pk='pk'):
+    """Выборка по ключу (pub_date, pk) без OFFSET.
+
+    После курсора after — новые первыми, перед курсором before —
+    старые первыми. Условие на pub_date вынесено отдельно от OR,
+    чтобы SQLite искал по диапазону индекса.
+    """
+    if before is not None:
+        pub_date, key = before
+        return queryset.filter(pub_date__gte=pub_date).filter(
+            Q(pub_date__gt=pub_date) | Q(**{f'{pk}__gt': key})
+        ).order_by('pub_date', pk)
+    if after is not None:
+        pub_date, key = after
+        queryset = queryset.filter(pub_date__lte=pub_date).filter(
+            Q(pub_date__lt=pub_date) | Q(**{f'{pk}__lt': key})
+        )
+    return queryset.order_by('-pub_date', f'-{pk}')
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинация ленты постов по ключу (pub_date, id).
+
+    Не выполняет COUNT(*) и OFFSET: каждая страница выбирается
+    условием по индексированному pub_date, поэтому стоимость
+    глубоких страниц не растёт с их номером.
+    """
+    is_cursor = True
+
+    def fetch(self, after=None, before=None, limit=None):
+        """Посты после after (новые первыми) или перед before."""
+        return list(keyset(self.object_list, after, before)[:limit])
+
+    def latest(self):
+        """Дата самого свежего поста ленты."""
+        return keyset(self.object_list).values_list(
+            'pub_date', flat=True).first()
+
+    def get_first_page(self):
+        """Первая страница как обычный Page (его ждёт контракт /follow/).
+
+        Строка сверх per_page задаёт нижнюю оценку count, которой
+        хватает для has_next без COUNT(*); курсор следующей страницы
+        хранится в самой странице.
+        """
+        rows = self.fetch(limit=self.per_page + 1)
+        self.count = len(rows)
+        page = Page(rows[:self.per_page], 1, self)
+        page.is_cursor = True
+        page.previous_cursor = None
+        page.next_cursor = (encode_cursor(rows[self.per_page - 1])
+                            if len(rows) > self.per_page else None)
+        return page
+
+    def get_cursor_page(self, after=None, before=None):
+        after = decode_cursor(after)
+        before = decode_cursor(before) if after is None else None
+        if before is not None:
+            rows = self.fetch(before=before, limit=self.per_page + 1)
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            if not rows:
+                return self.get_cursor_page()
+            return CursorPage(
+                rows, self,
+                next_cursor=encode_cursor(rows[-1]),
+                previous_cursor=encode_cursor(rows[0]) if has_more else None,
+            )
+        rows = self.fetch(after=after, limit=self.per_page + 1)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        next_cursor = encode_cursor(rows[-1]) if has_more else None
+        previous_cursor = None
+        if after is not None and rows:
+            previous_cursor = encode_cursor(rows[0])
+        return CursorPage(
+            rows, self,
+            next_cursor=next_cursor,
+            previous_cursor=previous_cursor,
+        )
+
+
+class WindowPaginator(Paginator):
+    """Постраничная пагинация с ограниченным окном номеров страниц.
+
+    Общее число объектов можно передать заранее (например, из счётчика
+    или кэша) — тогда COUNT(*) по ленте не выполняется.
+    """
+    ELLIPSIS = '…'
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        if count is not None:
+            self.count = count
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        return self._get_page(self.object_list[bottom:top], number, self)
+
+    def get_elided_page_range(self, number=1, on_each_side=2, on_ends=1):
+        """Номера страниц вокруг текущей и по краям, пропуски — ELLIPSIS."""
+        number = self.validate_number(number)
+        num_pages = self.num_pages
+        if num_pages <= (on_each_side + on_ends) * 2 + 1:
+            yield from range(1, num_pages + 1)
+            return
+        if number > on_each_side + on_ends + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < num_pages - on_each_side - on_ends:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(num_pages - on_ends + 1, num_pages + 1)
+        else:
+            yield from range(number + 1, num_pages + 1)
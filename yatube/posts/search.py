@@ -0,0 +1,104 @@
+import re
+
+from django.db import connection
+
+from .models import Post
+
+# Виртуальная таблица FTS5, создаётся миграцией 0011.
+FTS_TABLE = 'posts_post_fts'
+
+# Сколько лучших совпадений отдаёт поиск.
+SEARCH_LIMIT = 1000
+
+WORD_RE = re.compile(r'\w+')
+
+
+def is_supported():
+    """Полнотекстовый индекс FTS5 есть только на SQLite."""
+    return connection.vendor == 'sqlite'
+
+
+def build_query(text):
+    """Запрос FTS5 из пользовательской строки.
+
+    Берутся только слова, каждое ищется как префикс — это грубо
+    заменяет морфологию русского языка. Операторы FTS5 из ввода
+    не попадают в запрос.
+    """
+    words = WORD_RE.findall(text.lower())
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def index_post(post):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                       [post.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+            [post.pk, post.text])
+
+
+def unindex_post(post_id):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                       [post_id])
+
+
+def rebuild():
+    """Пересобирает индекс по всем постам. Возвращает их число."""
+    if not is_supported():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, text) '
+            f'SELECT id, text FROM {Post._meta.db_table}')
+        cursor.execute(f'SELECT count(*) FROM {FTS_TABLE}')
+        return cursor.fetchone()[0]
+
+
+def filter_posts(queryset, text):
+    """Посты queryset, подходящие под запрос, без ограничения числа.
+
+    Совпадения отбираются подзапросом к индексу в той же выборке,
+    а не списком идентификаторов, который на частом слове упёрся бы
+    в лимит параметров SQLite. Без FTS5 — LIKE по каждому слову.
+    """
+    query = build_query(text)
+    if not query:
+        return queryset.none()
+    if not is_supported():
+        for word in WORD_RE.findall(text):
+            queryset = queryset.filter(text__icontains=word)
+        return queryset
+    table = Post._meta.db_table
+    return queryset.extra(
+        where=[f'{table}.id IN (SELECT rowid FROM {FTS_TABLE} '
+               f'WHERE {FTS_TABLE} MATCH %s)'],
+        params=[query])
+
+
+def search_ids(text, limit=SEARCH_LIMIT):
+    """Идентификаторы постов по убыванию релевантности (BM25).
+
+    limit=None снимает ограничение. Без FTS5 откатывается на LIKE
+    по тексту, новые посты первыми.
+    """
+    query = build_query(text)
+    if not query:
+        return []
+    if not is_supported():
+        posts = Post.objects.all()
+        for word in WORD_RE.findall(text):
+            posts = posts.filter(text__icontains=word)
+        return list(posts.values_list('pk', flat=True)[:limit])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'ORDER BY bm25({FTS_TABLE}) LIMIT %s',
+            [query, -1 if limit is None else limit])
+        return [row[0] for row in cursor.fetchall()]
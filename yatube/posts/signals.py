@@ -0,0 +1,175 @@
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import counters, feeds, search, storage
+from .caching import (bump_feed_version, invalidate_post_card,
+                      invalidate_post_cards, post_feeds)
+from .images import (release_file, reuse_variants, schedule_variants,
+                     source_exists)
+from .models import Follow, Group, Post, User
+
+# Поля, которые выводятся в карточке поста.
+CARD_FIELDS = {
+    User: ('username', 'first_name', 'last_name'),
+    Group: ('title', 'slug'),
+}
+
+
+@receiver(pre_save, sender=Post)
+def remember_old_state(sender, instance, **kwargs):
+    if instance._state.adding or instance.pk is None:
+        return
+    old = Post.objects.filter(pk=instance.pk).values_list(
+        'group_id', 'image').first()
+    if old is not None:
+        instance._old_group_id, instance._old_image = old
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.change_counts(counters.post_keys(instance), 1)
+        feeds.fan_out(instance)
+        return
+    old_group_id = getattr(instance, '_old_group_id', instance.group_id)
+    if old_group_id != instance.group_id:
+        if old_group_id is not None:
+            counters.change_counts([counters.group_key(old_group_id)], -1)
+        if instance.group_id is not None:
+            counters.change_counts(
+                [counters.group_key(instance.group_id)], 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.change_counts(counters.post_keys(instance), -1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def drop_post_card(sender, instance, **kwargs):
+    invalidate_post_card(instance)
+
+
+def card_rows(posts):
+    return posts.order_by().values_list('pk', 'pub_date').iterator()
+
+
+@receiver(pre_save, sender=User)
+@receiver(pre_save, sender=Group)
+def remember_card_fields(sender, instance, update_fields=None, **kwargs):
+    fields = CARD_FIELDS[sender]
+    if instance.pk is None or (
+            update_fields is not None and not set(fields) & update_fields):
+        return
+    instance._old_card_fields = sender.objects.filter(
+        pk=instance.pk).values_list(*fields).first()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Group)
+def drop_renamed_cards(sender, instance, created, raw=False, **kwargs):
+    old = getattr(instance, '_old_card_fields', None)
+    if raw or created or old is None:
+        return
+    del instance._old_card_fields
+    new = tuple(getattr(instance, field) for field in CARD_FIELDS[sender])
+    if new == old:
+        return
+    invalidate_post_cards(card_rows(instance.posts.all()))
+    if sender is User:
+        bump_feed_version()
+
+
+@receiver(pre_delete, sender=Group)
+def remember_group_cards(sender, instance, **kwargs):
+    instance._card_rows = list(card_rows(instance.posts.all()))
+
+
+@receiver(post_delete, sender=Group)
+def drop_group_cards(sender, instance, **kwargs):
+    invalidate_post_cards(getattr(instance, '_card_rows', []))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def bump_post_feeds(sender, instance, **kwargs):
+    bump_feed_version(*post_feeds(instance))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def bump_group_feeds(sender, created=False, **kwargs):
+    # Название группы выводится на главной, в профилях и на страницах
+    # постов; правка группы — редкая операция, сдвигаются все ленты.
+    if not created:
+        bump_feed_version()
+
+
+@receiver(post_save, sender=Post)
+def queue_image_variants(sender, instance, raw=False, **kwargs):
+    if raw or not instance.image or not source_exists(instance.image):
+        return
+    name = instance.image.name
+    if instance.image_variants.filter(source=name).exists():
+        return
+    post_id = instance.pk
+    if reuse_variants(post_id, name):
+        return
+    transaction.on_commit(lambda: schedule_variants(post_id, name))
+
+
+@receiver(post_save, sender=Post)
+def release_image_claim(sender, instance, raw=False, **kwargs):
+    # Ссылка на файл записана, дальше его бережёт счётчик ссылок.
+    if not raw and instance.image:
+        storage.release_claims([instance.image.name])
+
+
+def release_after_commit(names):
+    for name in set(names):
+        transaction.on_commit(lambda name=name: release_file(name))
+
+
+@receiver(post_save, sender=Post)
+def release_replaced_image(sender, instance, created, raw=False, **kwargs):
+    old_image = getattr(instance, '_old_image', None)
+    if raw or created or not old_image or old_image == instance.image.name:
+        return
+    release_after_commit([old_image])
+
+
+@receiver(pre_delete, sender=Post)
+def remember_post_files(sender, instance, **kwargs):
+    instance._files = [instance.image.name] + list(
+        instance.image_variants.values_list('image', flat=True))
+
+
+@receiver(post_delete, sender=Post)
+def release_post_files(sender, instance, **kwargs):
+    release_after_commit(getattr(instance, '_files', []))
+
+
+@receiver(post_save, sender=Post)
+def index_post_text(sender, instance, **kwargs):
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post_text(sender, instance, **kwargs):
+    search.unindex_post(instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        feeds.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def unfill_feed(sender, instance, **kwargs):
+    feeds.unfill(instance.user_id, instance.author_id)
@@ -0,0 +1,81 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+
+from core.cache import hold_lock
+
+FANOUT = 2
+
+
+def file_digest(content):
+    """SHA-256 содержимого файла, читаемого кусками."""
+    digest = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+def hashed_name(name, digest):
+    """Путь файла по хэшу: <каталог>/<ab>/<хэш><расширение>."""
+    directory, filename = os.path.split(name)
+    extension = os.path.splitext(filename)[1].lower()
+    return os.path.join(directory, digest[:FANOUT], digest + extension)
+
+
+def file_lock_key(name):
+    """Замок файла: запись и удаление одного имени не пересекаются."""
+    return f'posts:media:lock:{name}'
+
+
+def claim_key(name):
+    return f'posts:media:claim:{name}'
+
+
+def release_claims(names):
+    """Снимает отметки повторного использования: ссылки на файлы
+    записаны в базу или уже не будут записаны.
+    """
+    cache.delete_many([claim_key(name) for name in names])
+
+
+def is_claimed(name):
+    return cache.get(claim_key(name)) is not None
+
+
+def is_hashed(name):
+    """Лежит ли файл уже под своим хэшем."""
+    stem = os.path.splitext(os.path.basename(name))[0]
+    parent = os.path.basename(os.path.dirname(name))
+    return (len(stem) == 64 and parent == stem[:FANOUT]
+            and all(char in '0123456789abcdef' for char in stem))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Файловое хранилище, раскладывающее файлы по хэшу содержимого.
+
+    Одинаковые файлы получают одно имя и хранятся один раз: повторное
+    сохранение возвращает имя уже лежащего файла. Исходное имя задаёт
+    только каталог и расширение. Удалять общий файл можно, только
+    когда на него не осталось ссылок, — см. posts.images.release_file.
+
+    Проверка и запись идут под замком файла, тем же, что берёт
+    удаление. Найденный файл получает отметку на
+    POST_IMAGE_CLAIM_TIMEOUT: ссылка на него появится в базе позже,
+    и до тех пор удалять его нельзя.
+    """
+
+    def _save(self, name, content):
+        name = hashed_name(name, file_digest(content))
+        with hold_lock(file_lock_key(name)):
+            if self.exists(name):
+                cache.set(claim_key(name), True,
+                          settings.POST_IMAGE_CLAIM_TIMEOUT)
+                return name
+            return super()._save(name, content)
@@ -0,0 +1,50 @@
+from django import template
+from django.conf import settings
+
+from core.cache import get_or_compute
+
+from ..caching import POST_CARD_VARIANTS, post_card_key
+from ..images import Picture
+
+register = template.Library()
+
+
+class PostCardNode(template.Node):
+    def __init__(self, nodelist, post, variant):
+        self.nodelist = nodelist
+        self.post = post
+        self.variant = variant
+
+    def render(self, context):
+        post = self.post.resolve(context)
+        picture = Picture(post)
+        key = post_card_key(
+            post.pk, post.pub_date, self.variant, picture.ready)
+
+        def render_card():
+            with context.push(picture=picture):
+                return self.nodelist.render(context)
+        return get_or_compute(key, render_card, settings.POST_CARD_TIMEOUT)
+
+
+@register.tag
+def post_card(parser, token):
+    """Карточка поста во фрагментном кэше.
+
+    {% post_card post 'feed' %}...{% endpost_card %} — ключ строится
+    в posts.caching, внутри блока доступна переменная picture.
+    Популярную карточку, как и страницы лент, пересчитывает один
+    запрос (core.cache.get_or_compute).
+    """
+    bits = token.split_contents()
+    if len(bits) != 3:
+        raise template.TemplateSyntaxError(
+            f'{bits[0]} ждёт пост и вариант ленты')
+    variant = bits[2].strip('\'"')
+    if variant not in POST_CARD_VARIANTS:
+        raise template.TemplateSyntaxError(
+            f'{bits[0]}: неизвестный вариант {variant!r}, '
+            f'допустимы {", ".join(POST_CARD_VARIANTS)}')
+    nodelist = parser.parse(('endpost_card',))
+    parser.delete_first_token()
+    return PostCardNode(nodelist, parser.compile_filter(bits[1]), variant)
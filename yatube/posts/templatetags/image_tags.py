@@ -0,0 +1,11 @@
+from django import template
+
+from ..images import Picture
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_picture(post):
+    """Варианты картинки поста для тега <picture>."""
+    return Picture(post)
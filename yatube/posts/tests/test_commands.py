@@ -0,0 +1,181 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from ..models import Comment, FeedEntry, Follow, Group, Post, User
+
+
+class GenerateDataCommandTests(TestCase):
+    def test_generate_data(self):
+        """Команда генерирует пользователей, посты, подписки и ленты."""
+        call_command(
+            'generate_data', users=30, groups=3, posts=200, comments=100,
+            follows=5, seed=1, stdout=StringIO())
+        self.assertEqual(
+            User.objects.filter(username__startswith='bench_user_').count(),
+            30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 100)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(FeedEntry.objects.exists())
+
+
+class BenchmarkViewsCommandTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        call_command(
+            'generate_data', users=10, groups=2, posts=50, comments=20,
+            follows=3, seed=1, stdout=StringIO())
+
+    def test_benchmark_json_report(self):
+        """Отчёт прогона содержит перцентили и число запросов."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'report.json')
+            call_command(
+                'benchmark_views', requests=3, json=path, stdout=StringIO())
+            with open(path) as source:
+                report = json.load(source)
+            output = StringIO()
+            call_command(
+                'benchmark_views', requests=3, compare=path, stdout=output)
+        self.assertIn('index', report['endpoints'])
+        self.assertIn('follow_index', report['endpoints'])
+        for stats in report['endpoints'].values():
+            self.assertEqual(stats['statuses'], {'200': 3})
+            self.assertLessEqual(stats['p50_ms'], stats['p99_ms'])
+        self.assertIn('p50_ms=', output.getvalue())
+
+
+class ExplainQueriesCommandTests(TestCase):
+    def test_feed_queries_use_indexes(self):
+        """Запросы лент не читают таблицы постов целиком."""
+        call_command(
+            'generate_data', users=10, groups=2, posts=50, comments=20,
+            follows=3, seed=1, stdout=StringIO())
+        out = StringIO()
+        call_command('explain_queries', stdout=out)
+        self.assertIn('Полных проходов нет', out.getvalue())
+
+
+class TransferCommandsTests(TestCase):
+    def setUp(self):
+        call_command(
+            'generate_data', users=10, groups=2, posts=60, comments=30,
+            follows=3, seed=1, stdout=StringIO())
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def export(self, name, **options):
+        path = os.path.join(self.directory, name)
+        call_command('export_posts', path, stderr=StringIO(), **options)
+        with open(path, encoding='utf-8') as source:
+            return source.read()
+
+    def test_round_trip(self):
+        """Выгрузка, загрузка в пустую базу и повторная выгрузка совпадают."""
+        for name in ('dump.ndjson', 'dump.csv'):
+            with self.subTest(name=name):
+                dump = self.export(name)
+                path = os.path.join(self.directory, name)
+                Group.objects.all().delete()
+                Post.objects.all().delete()
+                Follow.objects.all().delete()
+                call_command('import_posts', path, stderr=StringIO())
+                self.assertEqual(Post.objects.count(), 60)
+                self.assertEqual(Comment.objects.count(), 30)
+                self.assertEqual(self.export(name), dump)
+
+    def test_import_refuses_non_empty_database(self):
+        """Загрузка поверх существующих записей отклоняется."""
+        dump = self.export('dump.ndjson')
+        path = os.path.join(self.directory, 'dump.ndjson')
+        Post.objects.all().delete()
+        with self.assertRaisesMessage(CommandError, 'group, follow'):
+            call_command('import_posts', path, stderr=StringIO())
+        self.assertFalse(Post.objects.exists())
+        with self.assertRaises(CommandError):
+            call_command('import_posts', path, resume=True,
+                         stderr=StringIO())
+        Group.objects.all().delete()
+        Follow.objects.all().delete()
+        call_command('import_posts', path, stderr=StringIO())
+        self.assertEqual(self.export('dump.ndjson'), dump)
+
+    def test_export_resume(self):
+        """Оборванный экспорт дописывается с последней записи."""
+        dump = self.export('dump.ndjson')
+        path = os.path.join(self.directory, 'dump.ndjson')
+        with open(path, 'w', encoding='utf-8') as target:
+            target.write(''.join(dump.splitlines(True)[:50]))
+        self.assertEqual(self.export('dump.ndjson', resume=True), dump)
+
+    def test_export_resume_drops_partial_record(self):
+        """Оборванная запись отрезается, многострочный текст не мешает."""
+        Post.objects.filter(pk=Post.objects.order_by('pk')[5].pk).update(
+            text='Первая строка\nвторая, с запятой\n"третья"')
+        for name in ('dump.ndjson', 'dump.csv'):
+            self.export(name)
+            path = os.path.join(self.directory, name)
+            with open(path, 'rb') as source:
+                dump = source.read()
+            end = dump.index(b'\n', dump.index('третья'.encode())) + 1
+            cuts = (dump.index('вторая'.encode()), len(dump) - 3,
+                    dump.index('Первая'.encode()) - 1, end)
+            for cut in cuts:
+                with self.subTest(name=name, cut=cut):
+                    with open(path, 'wb') as target:
+                        target.write(dump[:cut])
+                    call_command('export_posts', path, resume=True,
+                                 stderr=StringIO())
+                    with open(path, 'rb') as source:
+                        self.assertEqual(source.read(), dump)
+
+    def test_import_resume(self):
+        """Импорт продолжается с сохранённой позиции."""
+        self.export('dump.ndjson')
+        path = os.path.join(self.directory, 'dump.ndjson')
+        Post.objects.all().delete()
+        with open(f'{path}.progress', 'w') as target:
+            target.write('2')
+        call_command('import_posts', path, resume=True, stderr=StringIO())
+        self.assertEqual(Post.objects.count(), 60)
+        self.assertEqual(Comment.objects.count(), 30)
+        self.assertFalse(os.path.exists(f'{path}.progress'))
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class CollectMediaCommandTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_collect_media(self):
+        """Старые файлы переносятся под хэш, сироты удаляются."""
+        user = User.objects.create_user(username='media_user')
+        plain = FileSystemStorage()
+        legacy = plain.save('posts/legacy.gif', ContentFile(b'GIF89a'))
+        orphan = plain.save('cache/ab/old_thumb.jpg', ContentFile(b'x'))
+        post = Post.objects.create(author=user, text='Пост')
+        Post.objects.filter(pk=post.pk).update(image=legacy)
+        call_command('collect_media', grace=0, stdout=StringIO())
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.name, legacy)
+        self.assertTrue(default_storage.exists(post.image.name))
+        self.assertFalse(default_storage.exists(legacy))
+        self.assertFalse(default_storage.exists(orphan))
@@ -0,0 +1,79 @@
+from io import StringIO
+
+from faker import Faker
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.routers import has_written, reset_writes
+
+from ..counters import ALL_POSTS, author_key, get_count, group_key
+from ..models import Group, Post, PostCounter
+
+fake = Faker()
+User = get_user_model()
+
+
+class PostCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='counter_user')
+        cls.group = Group.objects.create(
+            title=fake.text(),
+            slug='counter-slug',
+            description=fake.text(),
+        )
+        cls.other_group = Group.objects.create(
+            title=fake.text(),
+            slug='other-counter-slug',
+            description=fake.text(),
+        )
+
+    def counter(self, key):
+        return PostCounter.objects.get(key=key).value
+
+    def test_missing_counter_is_created_from_database(self):
+        """Отсутствующий счётчик считается по базе и сохраняется."""
+        Post.objects.bulk_create([
+            Post(text=fake.text(), author=self.user) for _ in range(3)
+        ])
+        reset_writes()
+        self.assertEqual(get_count(ALL_POSTS, Post.objects.all()), 3)
+        self.assertEqual(self.counter(ALL_POSTS), 3)
+        self.assertFalse(has_written())
+
+    def test_signals_keep_counters_in_sync(self):
+        """Создание, смена группы и удаление поста меняют счётчики."""
+        keys = (ALL_POSTS, author_key(self.user.pk), group_key(self.group.pk),
+                group_key(self.other_group.pk))
+        for key in keys:
+            get_count(key, Post.objects.none())
+        post = Post.objects.create(
+            text=fake.text(), author=self.user, group=self.group)
+        self.assertEqual(self.counter(ALL_POSTS), 1)
+        self.assertEqual(self.counter(author_key(self.user.pk)), 1)
+        self.assertEqual(self.counter(group_key(self.group.pk)), 1)
+        post.group = self.other_group
+        post.save()
+        self.assertEqual(self.counter(group_key(self.group.pk)), 0)
+        self.assertEqual(self.counter(group_key(self.other_group.pk)), 1)
+        post.delete()
+        for key in keys:
+            with self.subTest(key=key):
+                self.assertEqual(self.counter(key), 0)
+
+    def test_reconcile_command(self):
+        """Команда сверки исправляет расхождения и удаляет лишнее."""
+        get_count(ALL_POSTS, Post.objects.all())
+        Post.objects.bulk_create([
+            Post(text=fake.text(), author=self.user, group=self.group)
+            for _ in range(2)
+        ])
+        PostCounter.objects.create(key=group_key(0), value=5)
+        call_command('reconcile_post_counters', stdout=StringIO())
+        self.assertEqual(self.counter(ALL_POSTS), 2)
+        self.assertEqual(self.counter(author_key(self.user.pk)), 2)
+        self.assertEqual(self.counter(group_key(self.group.pk)), 2)
+        self.assertFalse(
+            PostCounter.objects.filter(key=group_key(0)).exists())
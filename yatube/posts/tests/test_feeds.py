@@ -0,0 +1,164 @@
+from io import StringIO
+
+from faker import Faker
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import feeds
+from ..feeds import FollowFeedPaginator
+from ..models import FeedEntry, Follow, Post
+
+fake = Faker()
+User = get_user_model()
+
+
+def follow_feed(user, per_page=100):
+    return FollowFeedPaginator(
+        Post.objects.all(), per_page, user=user).get_cursor_page()
+
+
+class FollowFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='feed_author')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        """Новый пост попадает в ленты подписчиков автора."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text=fake.text(), author=self.author)
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.reader, post=post).exists())
+        self.assertIn(post, follow_feed(self.reader))
+
+    def test_follow_backfills_and_unfollow_clears_feed(self):
+        """Подписка добавляет старые посты, отписка их убирает."""
+        posts = [
+            Post.objects.create(text=fake.text(), author=self.author)
+            for _ in range(3)
+        ]
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertCountEqual(follow_feed(self.reader), posts)
+        follow.delete()
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+        self.assertFalse(follow_feed(self.reader))
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_celebrity_posts_are_read_on_demand(self):
+        """Посты авторов с большим числом подписчиков не раскладываются."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text=fake.text(), author=self.author)
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        self.assertIn(post, follow_feed(self.reader))
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_pages_merge_entries_and_celebrities(self):
+        """Страницы ленты идут по (pub_date, id) через обе части ленты."""
+        celebrity = User.objects.create_user(username='celebrity')
+        fan = User.objects.create_user(username='fan')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=celebrity)
+        Follow.objects.create(user=fan, author=celebrity)
+        posts = [
+            Post.objects.create(
+                text=fake.text(), author=(self.author, celebrity)[i % 2])
+            for i in range(7)
+        ]
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.reader).count(), 4)
+        paginator = FollowFeedPaginator(
+            Post.objects.all(), 3, user=self.reader)
+        page = paginator.get_cursor_page()
+        seen = list(page)
+        while page.has_next():
+            page = paginator.get_cursor_page(after=page.next_cursor)
+            seen += list(page)
+        self.assertEqual(seen, posts[::-1])
+        back = paginator.get_cursor_page(before=page.previous_cursor)
+        self.assertEqual(list(back), posts[::-1][3:6])
+        self.assertEqual(paginator.latest(), posts[-1].pub_date)
+
+    def test_follow_index_pages_by_cursor(self):
+        """Страница /follow/ листается курсором без COUNT(*)."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [
+            Post.objects.create(text=fake.text(), author=self.author)
+            for _ in range(12)
+        ]
+        client = Client()
+        client.force_login(self.reader)
+        url = reverse('posts:follow_index')
+        with CaptureQueriesContext(connection) as queries:
+            first = client.get(url).context['page_obj']
+        self.assertFalse(any(
+            'COUNT(*)' in query['sql'] for query in queries.captured_queries))
+        self.assertEqual(list(first), posts[:-11:-1])
+        self.assertTrue(first.has_next())
+        second = client.get(
+            url, {'after': first.next_cursor}).context['page_obj']
+        self.assertEqual(list(second), posts[1::-1])
+        self.assertFalse(second.has_next())
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_feeds_restored_when_author_stops_being_celebrity(self):
+        """Посты, написанные в статусе знаменитости, не теряются."""
+        fan = User.objects.create_user(username='fan')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=fan, author=self.author)
+        post = Post.objects.create(text=fake.text(), author=self.author)
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        self.assertIn(post, follow_feed(self.reader))
+        Follow.objects.filter(user=fan).delete()
+        cache.clear()
+        self.assertIn(post, follow_feed(self.reader))
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.reader, post=post).exists())
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_follow_that_makes_author_celebrity_shows_posts(self):
+        """Подписка сверх порога сразу показывает посты автора."""
+        fan = User.objects.create_user(username='fan')
+        post = Post.objects.create(text=fake.text(), author=self.author)
+        Follow.objects.create(user=fan, author=self.author)
+        self.assertIn(post, follow_feed(fan))
+        self.assertNotIn(self.author.pk, feeds.get_celebrity_ids())
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+        self.assertEqual(list(follow_feed(self.reader)), [post])
+        self.assertEqual(list(follow_feed(fan)), [post])
+
+    def test_rebuild_feeds_command(self):
+        """Команда пересборки восстанавливает ленты по подпискам."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text=fake.text(), author=self.author)
+        FeedEntry.objects.all().delete()
+        call_command('rebuild_feeds', stdout=StringIO())
+        self.assertIn(post, follow_feed(self.reader))
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_rebuild_matches_fan_out(self):
+        """Пересборка даёт те же записи, что и раскладка, без знаменитостей."""
+        celebrity = User.objects.create_user(username='celebrity')
+        fan = User.objects.create_user(username='fan')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=celebrity)
+        Follow.objects.create(user=fan, author=celebrity)
+        for author in (self.author, celebrity, self.author):
+            Post.objects.create(text=fake.text(), author=author)
+        entries = FeedEntry.objects.values_list('user', 'post', 'pub_date')
+        expected = set(entries)
+        FeedEntry.objects.all().delete()
+        self.assertEqual(feeds.rebuild(), len(expected))
+        self.assertEqual(set(entries), expected)
+        FeedEntry.objects.filter(user=self.reader).delete()
+        self.assertEqual(feeds.rebuild(self.reader), 2)
+        self.assertEqual(set(entries), expected)
@@ -1,6 +1,9 @@
+import shutil
 import tempfile
+from io import BytesIO
 
 from faker import Faker
+from PIL import Image
 
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.contrib.auth import get_user_model
@@ -180,3 +183,68 @@ class CommentsTests(TestCase):
             'posts:add_comment', args=(self.post.id,))
         self.assertRedirects(response, redirect_address)
         self.assertEqual(Comment.objects.count(), comments_count)
+
+
+def make_png(width, height):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), 'blue').save(buffer, 'PNG')
+    return SimpleUploadedFile(
+        name='upload.png', content=buffer.getvalue(),
+        content_type='image/png')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POST_IMAGE_WORKERS=0)
+class PostImageUploadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='uploader')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def create_post(self, image):
+        return self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': fake.text(), 'image': image},
+        )
+
+    def test_form_sends_files(self):
+        """Форма поста отправляет файлы."""
+        response = self.authorized_client.get(reverse('posts:post_create'))
+        self.assertContains(response, 'enctype="multipart/form-data"')
+
+    def test_image_is_saved(self):
+        """Загруженная картинка сохраняется в посте."""
+        self.create_post(make_png(40, 20))
+        post = Post.objects.get(author=self.user)
+        self.assertTrue(post.image.name.startswith('posts/'))
+        self.assertEqual((post.image.width, post.image.height), (40, 20))
+
+    @override_settings(POST_IMAGE_MAX_UPLOAD_SIZE=100)
+    def test_oversized_file_rejected(self):
+        """Файл больше лимита не принимается."""
+        response = self.create_post(make_png(200, 200))
+        self.assertFormError(
+            response, 'form', 'image', 'Файл больше 100\xa0байт.')
+        self.assertFalse(Post.objects.filter(author=self.user).exists())
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100)
+    def test_too_many_pixels_rejected(self):
+        """Картинка с разрешением больше лимита не принимается."""
+        response = self.create_post(make_png(20, 20))
+        self.assertFormError(
+            response, 'form', 'image', 'Картинка больше 0,0001 мегапикселей.')
+        self.assertFalse(Post.objects.filter(author=self.user).exists())
+
+    @override_settings(POST_IMAGE_MAX_SIDE=150)
+    def test_large_image_downscaled(self):
+        """Слишком большой оригинал уменьшается при загрузке."""
+        self.create_post(make_png(300, 100))
+        post = Post.objects.get(author=self.user)
+        self.assertEqual((post.image.width, post.image.height), (150, 50))
@@ -0,0 +1,179 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from PIL import Image
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..images import (build_variants, get_widths, posts_without_variants,
+                      release_file, save_variants)
+from ..models import Post, PostImageVariant
+from ..storage import release_claims
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_jpeg(width, height, color='red'):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), color).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POST_IMAGE_WORKERS=0)
+class PostImageVariantTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='image_user')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='photo.jpg', content=make_jpeg(1000, 500),
+                content_type='image/jpeg'),
+        )
+
+    def test_widths_do_not_upscale(self):
+        """Варианты шире исходной картинки не создаются."""
+        self.assertEqual(get_widths(1000), [480, 960])
+        self.assertEqual(get_widths(100), [480])
+
+    def test_build_variants(self):
+        """Варианты обрезаются до пропорций карточки."""
+        variants = build_variants(self.post.image.name)
+        jpegs = [v for v in variants if v['format'] == 'jpeg']
+        self.assertEqual([v['width'] for v in jpegs], [480, 960])
+        for variant in jpegs:
+            with default_storage.open(variant['image']) as file:
+                size = Image.open(file).size
+            self.assertEqual(size, (variant['width'], variant['height']))
+        self.assertEqual(jpegs[1]['height'], 339)
+
+    def test_original_until_variants_are_ready(self):
+        """До нарезки в ленте исходный файл, после — picture с srcset."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, f'src="{self.post.image.url}"')
+        self.assertNotContains(response, '480w')
+        name = self.post.image.name
+        save_variants(self.post.pk, name, build_variants(name))
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'width="960" height="339"')
+        self.assertContains(response, '480w')
+
+    def test_missing_variants_are_requeued_on_read(self):
+        """Показ картинки без вариантов ставит её в очередь один раз."""
+        with mock.patch('posts.images.transaction.on_commit',
+                        side_effect=lambda callback: callback()), \
+                mock.patch('posts.images.schedule_variants') as schedule:
+            for _ in range(2):
+                self.client.get(reverse('posts:index'))
+        schedule.assert_called_once_with(self.post.pk, self.post.image.name)
+
+    def test_generate_image_variants_command(self):
+        """Команда нарезает варианты постов, у которых их нет."""
+        Post.objects.bulk_create([Post(
+            author=self.user, text='Импорт', image=self.post.image.name)])
+        self.assertEqual(posts_without_variants().count(), 2)
+        out = StringIO()
+        call_command('generate_image_variants', stdout=out)
+        self.assertIn('Нарезано: 1, взято готовых: 1', out.getvalue())
+        self.assertFalse(posts_without_variants().exists())
+
+    def test_stale_variants_are_dropped(self):
+        """Варианты старой картинки не сохраняются и удаляются."""
+        name = self.post.image.name
+        save_variants(self.post.pk, name, build_variants(name))
+        old = list(PostImageVariant.objects.values_list('image', flat=True))
+        self.post.image = SimpleUploadedFile(
+            name='other.jpg', content=make_jpeg(500, 500, 'green'),
+            content_type='image/jpeg')
+        self.post.save()
+        save_variants(self.post.pk, name, build_variants(name))
+        self.assertEqual(PostImageVariant.objects.count(), len(old))
+        new_name = self.post.image.name
+        save_variants(self.post.pk, new_name, build_variants(new_name))
+        self.assertFalse(
+            PostImageVariant.objects.exclude(source=new_name).exists())
+        for image in old:
+            self.assertFalse(default_storage.exists(image))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POST_IMAGE_WORKERS=0)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='dedup_user')
+
+    def create_post(self, content, name='photo.jpg'):
+        return Post.objects.create(
+            author=self.user,
+            text='Пост',
+            image=SimpleUploadedFile(
+                name=name, content=content, content_type='image/jpeg'),
+        )
+
+    def test_identical_images_share_file(self):
+        """Одинаковые картинки хранятся одним файлом под хэшем."""
+        content = make_jpeg(600, 300)
+        first = self.create_post(content, 'first.jpg')
+        second = self.create_post(content, 'second.jpg')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotIn('first', first.image.name)
+        self.assertTrue(default_storage.exists(first.image.name))
+
+    def test_duplicate_reuses_variants(self):
+        """Повторная картинка получает готовые варианты без нарезки."""
+        content = make_jpeg(600, 300)
+        first = self.create_post(content)
+        name = first.image.name
+        save_variants(first.pk, name, build_variants(name))
+        second = self.create_post(content)
+        self.assertEqual(
+            list(second.image_variants.values_list('image', flat=True)),
+            list(first.image_variants.values_list('image', flat=True)))
+
+    def test_release_keeps_shared_file(self):
+        """Файл удаляется, только когда на него не осталось ссылок."""
+        content = make_jpeg(600, 300)
+        first = self.create_post(content)
+        second = self.create_post(content)
+        name = first.image.name
+        first.delete()
+        release_file(name)
+        self.assertTrue(default_storage.exists(name))
+        second.delete()
+        release_file(name)
+        self.assertFalse(default_storage.exists(name))
+
+    def test_release_keeps_file_claimed_by_upload(self):
+        """Файл, найденный загрузкой без ссылки в базе, не удаляется."""
+        content = make_jpeg(600, 300)
+        post = self.create_post(content)
+        name = post.image.name
+        self.assertEqual(
+            default_storage.save('posts/again.jpg', ContentFile(content)),
+            name)
+        post.delete()
+        release_file(name)
+        self.assertTrue(default_storage.exists(name))
+        release_claims([name])
+        release_file(name)
+        self.assertFalse(default_storage.exists(name))
@@ -0,0 +1,33 @@
+from django.test import SimpleTestCase
+
+from ..paginators import WindowPaginator
+
+ELLIPSIS = WindowPaginator.ELLIPSIS
+
+
+class WindowPaginatorTests(SimpleTestCase):
+    def test_elided_page_range(self):
+        """Окно страниц ограничено вокруг текущей страницы."""
+        paginator = WindowPaginator(range(1000), 10)
+        cases = {
+            1: [1, 2, 3, ELLIPSIS, 100],
+            4: [1, 2, 3, 4, 5, 6, ELLIPSIS, 100],
+            50: [1, ELLIPSIS, 48, 49, 50, 51, 52, ELLIPSIS, 100],
+            100: [1, ELLIPSIS, 98, 99, 100],
+        }
+        for number, expected in cases.items():
+            with self.subTest(number=number):
+                self.assertEqual(
+                    list(paginator.get_elided_page_range(number)), expected)
+
+    def test_short_range_is_not_elided(self):
+        """Короткий список страниц выводится целиком."""
+        paginator = WindowPaginator(range(50), 10)
+        self.assertEqual(
+            list(paginator.get_elided_page_range(3)), [1, 2, 3, 4, 5])
+
+    def test_known_count_skips_counting(self):
+        """Переданное заранее число объектов используется как есть."""
+        paginator = WindowPaginator(range(15), 10, count=500)
+        self.assertEqual(paginator.num_pages, 50)
+        self.assertEqual(list(paginator.page(2)), list(range(10, 15)))
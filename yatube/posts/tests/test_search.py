@@ -0,0 +1,82 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Post
+from ..search import FTS_TABLE, build_query, filter_posts, search_ids
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='search_user')
+        cls.cats = Post.objects.create(
+            author=cls.user, text='Кошки любят спать на солнце')
+        cls.dogs = Post.objects.create(
+            author=cls.user, text='Собаки и кошки, кошки и собаки')
+        cls.other = Post.objects.create(
+            author=cls.user, text='Про погоду')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_build_query_drops_operators(self):
+        """Операторы FTS5 из ввода не попадают в запрос."""
+        self.assertEqual(build_query('кот OR "NEAR(" -*'),
+                         '"кот"* "or"* "near"*')
+        self.assertEqual(build_query('  ?! '), '')
+
+    def test_ranked_prefix_search(self):
+        """Поиск по префиксу, чаще встречающееся слово — выше."""
+        self.assertEqual(search_ids('кошк'), [self.dogs.pk, self.cats.pk])
+        self.assertEqual(search_ids('кошки солнце'), [self.cats.pk])
+
+    def test_index_follows_saves_and_deletes(self):
+        """Индекс обновляется при правке и удалении поста."""
+        post = Post.objects.get(pk=self.other.pk)
+        post.text = 'Теперь и про кошек'
+        post.save()
+        self.assertIn(post.pk, search_ids('кошек'))
+        self.assertNotIn(post.pk, search_ids('погоду'))
+        post.delete()
+        self.assertNotIn(self.other.pk, search_ids('кошек'))
+
+    def test_search_view(self):
+        """Страница поиска показывает найденные посты."""
+        response = self.client.get(reverse('posts:search'), {'q': 'собаки'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['page_obj']), [self.dogs])
+        self.assertContains(response, 'Найдено записей: 1')
+
+    def test_admin_search_filters_by_subquery(self):
+        """Поиск в админке отбирает посты подзапросом к индексу."""
+        admin = User.objects.create_superuser(
+            'search_admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('admin:posts_post_changelist'), {'q': 'кошк'})
+        self.assertCountEqual(
+            response.context['cl'].result_list, [self.cats, self.dogs])
+        self.assertTrue(any(
+            f'SELECT rowid FROM {FTS_TABLE}' in query['sql']
+            for query in queries.captured_queries))
+        self.assertCountEqual(
+            filter_posts(Post.objects.all(), 'погоду'), [self.other])
+        self.assertFalse(filter_posts(Post.objects.all(), '?!'))
+
+    def test_rebuild_command(self):
+        """Команда восстанавливает индекс с нуля."""
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        self.assertEqual(search_ids('погоду'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(search_ids('погоду'), [self.other.pk])
@@ -7,12 +7,22 @@ from faker import Faker
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.db import connection
+from django.template import Context, Template, TemplateSyntaxError
+from django.test import (Client, SimpleTestCase, TestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.conf import settings
 
+from core.cache import acquire_lock, release_lock
+from core.routers import ReplicaRouter, use_replicas
+
+from ..caching import (FEED_BUMPED_KEY, INDEX_FEED, author_feed,
+                       bump_feed_version, feed_state, feed_timeout,
+                       get_feed_version, group_feed, post_card_key)
 from ..forms import PostForm
-from ..models import Group, Post, Follow
+from ..models import Comment, Group, Post, Follow
 
 fake = Faker()
 User = get_user_model()
@@ -166,6 +176,111 @@ class PaginatorViewsTest(TestCase):
                     count_post_two_page)
 
 
+class CursorPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='CursorUser')
+        cls.group = Group.objects.create(
+            title=fake.text(),
+            slug='cursor-slug',
+            description=fake.text(),
+        )
+        cls.post_test_count = settings.POSTS_CHIK * 2 + 3
+        Post.objects.bulk_create([
+            Post(text=fake.text(), author=cls.user, group=cls.group)
+            for _ in range(cls.post_test_count)
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cursor_pagination(self):
+        """Курсорная пагинация проходит ленту без пропусков и повторов."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                seen = []
+                page_obj = self.client.get(url).context['page_obj']
+                seen.extend(post.pk for post in page_obj)
+                while page_obj.has_next():
+                    page_obj = self.client.get(
+                        url, {'after': page_obj.next_cursor}
+                    ).context['page_obj']
+                    self.assertTrue(page_obj.has_previous())
+                    seen.extend(post.pk for post in page_obj)
+                self.assertEqual(len(seen), self.post_test_count)
+                self.assertEqual(len(set(seen)), self.post_test_count)
+                self.assertEqual(
+                    seen,
+                    list(Post.objects.order_by(
+                        '-pub_date', '-pk').values_list('pk', flat=True))
+                )
+
+    def test_cursor_previous_page(self):
+        """Токен before возвращает предыдущую страницу."""
+        url = reverse('posts:index')
+        first_page = self.client.get(url).context['page_obj']
+        second_page = self.client.get(
+            url, {'after': first_page.next_cursor}).context['page_obj']
+        previous_page = self.client.get(
+            url, {'before': second_page.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(previous_page), list(first_page))
+        self.assertFalse(previous_page.has_previous())
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Битый токен курсора отдаёт первую страницу."""
+        url = reverse('posts:index')
+        response = self.client.get(url, {'after': 'broken!'})
+        self.assertEqual(
+            len(response.context['page_obj']), settings.POSTS_CHIK)
+        self.assertFalse(response.context['page_obj'].has_previous())
+
+
+class PostDetailQueriesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='detail_user')
+        cls.group = Group.objects.create(
+            title=fake.text(),
+            slug='detail-slug',
+            description=fake.text(),
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text=fake.text(),
+            group=cls.group,
+        )
+        cls.url = reverse('posts:post_detail', args=(cls.post.id,))
+
+    def add_comments(self, count):
+        Comment.objects.bulk_create([
+            Comment(
+                post=self.post,
+                author=User.objects.create_user(username=fake.uuid4()),
+                text=fake.text(),
+            )
+            for _ in range(count)
+        ])
+
+    def test_post_detail_queries_do_not_grow_with_comments(self):
+        """Число запросов post_detail не зависит от числа комментариев."""
+        self.add_comments(2)
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as few_comments:
+            self.client.get(self.url)
+        self.add_comments(30)
+        with CaptureQueriesContext(connection) as many_comments:
+            response = self.client.get(self.url)
+        self.assertEqual(len(few_comments), len(many_comments))
+        self.assertEqual(len(response.context['comments']), 20)
+        self.assertTrue(response.context['comments'].has_next())
+
+
 class CacheTests(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -186,13 +301,151 @@ class CacheTests(TestCase):
         """Тест кэширования страницы index.html."""
         test_post = Post.objects.create(author=CacheTests.user)
         response = self.client.get(reverse('posts:index'))
-        test_post.delete()
+        Post.objects.filter(pk=self.post.pk).update(text='Тихая правка')
         response_2 = self.client.get(reverse('posts:index'))
         self.assertEqual(response.content, response_2.content)
-        cache.clear()
+        test_post.delete()
         response_3 = self.client.get(reverse('posts:index'))
         self.assertNotEqual(response.content, response_3.content)
 
+    def test_cache_is_not_shared_between_users(self):
+        """Закэшированная лента не отдаётся другому пользователю."""
+        self.client.get(reverse('posts:index'))
+        authorized_client = Client()
+        authorized_client.force_login(self.user)
+        response = authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, reverse('posts:follow_index'))
+
+    def test_post_bumps_only_its_feeds(self):
+        """Новый пост сдвигает поколения своих лент, но не чужих."""
+        group = Group.objects.create(title='Своя', slug='own')
+        other = Group.objects.create(title='Чужая', slug='other')
+        feeds = (INDEX_FEED, group_feed(group.slug),
+                 author_feed(self.user.username))
+        before = {feed: get_feed_version(feed) for feed in feeds}
+        untouched = get_feed_version(group_feed(other.slug))
+        Post.objects.create(author=self.user, text=fake.text(), group=group)
+        for feed in feeds:
+            with self.subTest(feed=feed):
+                self.assertNotEqual(get_feed_version(feed), before[feed])
+        self.assertEqual(get_feed_version(group_feed(other.slug)), untouched)
+
+    def test_short_timeout_without_shared_cache(self):
+        """С LocMemCache страницы лент живут TIME_CACHE_LOCAL."""
+        self.assertEqual(feed_timeout(), settings.TIME_CACHE_LOCAL)
+        with override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}):
+            self.assertEqual(feed_timeout(), settings.TIME_CACHE)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaFeedCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_feed_filled_from_primary_after_bump(self):
+        """Сразу после сдвига поколения кэш ленты не берётся с реплики."""
+        router = ReplicaRouter()
+
+        def alias():
+            return router.db_for_read(None)
+
+        with use_replicas():
+            bump_feed_version(INDEX_FEED)
+            self.assertEqual(
+                feed_state(INDEX_FEED, 'alias', alias)[0], 'default')
+            cache.delete(f'{FEED_BUMPED_KEY}:{INDEX_FEED}')
+            bump_feed_version(group_feed('calm'))
+            self.assertEqual(
+                feed_state(INDEX_FEED, 'other', alias)[0], 'replica')
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='card_user')
+        cls.group = Group.objects.create(
+            title=fake.text(),
+            slug='card-slug',
+            description=fake.text(),
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Исходный текст карточки',
+            group=cls.group,
+        )
+        cls.urls = (
+            reverse('posts:group_list', args=(cls.group.slug,)),
+            reverse('posts:profile', args=(cls.user.username,)),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_card_is_cached(self):
+        """Карточка поста берётся из фрагментного кэша."""
+        for url in self.urls:
+            self.client.get(url)
+        Post.objects.filter(pk=self.post.pk).update(text='Тихая правка')
+        for url in self.urls:
+            with self.subTest(url=url):
+                content = self.client.get(url).content.decode()
+                self.assertIn('Исходный текст карточки', content)
+
+    def test_post_card_invalidated_on_save(self):
+        """Сохранение поста сбрасывает кэш его карточки."""
+        for url in self.urls:
+            self.client.get(url)
+        self.post.text = 'Отредактированный текст'
+        self.post.save()
+        for url in self.urls:
+            with self.subTest(url=url):
+                content = self.client.get(url).content.decode()
+                self.assertIn('Отредактированный текст', content)
+                self.assertNotIn('Исходный текст карточки', content)
+
+    def test_post_card_invalidated_on_author_and_group_rename(self):
+        """Смена имени автора и названия группы сбрасывает карточки."""
+        profile, index = self.urls[1], reverse('posts:index')
+        self.client.get(profile)
+        self.client.get(index)
+        self.user.first_name = 'Переименованный'
+        self.user.save()
+        self.group.title = 'Новое название группы'
+        self.group.save()
+        content = self.client.get(profile).content.decode()
+        self.assertIn('Переименованный', content)
+        content = self.client.get(index).content.decode()
+        self.assertIn('Новое название группы', content)
+
+    def test_post_card_is_rendered_by_one_request(self):
+        """Пока карточку пересчитывает другой запрос, отдаётся старая."""
+        template = Template(
+            "{% load card_tags %}{% post_card post 'feed' %}"
+            "{{ post.text }}{% endpost_card %}")
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(
+            template.render(Context({'post': post})),
+            'Исходный текст карточки')
+        key = post_card_key(post.pk, post.pub_date, 'feed', False)
+        self.assertTrue(acquire_lock(f'{key}:lock', 10))
+        post.text = 'Тихая правка'
+        with self.settings(CACHE_EARLY_REFRESH_BETA=10 ** 9):
+            self.assertEqual(
+                template.render(Context({'post': post})),
+                'Исходный текст карточки')
+            release_lock(f'{key}:lock')
+            self.assertEqual(
+                template.render(Context({'post': post})),
+                'Тихая правка')
+
+    def test_unknown_card_variant_is_rejected(self):
+        """Вариант карточки проверяется по POST_CARD_VARIANTS."""
+        with self.assertRaises(TemplateSyntaxError):
+            Template(
+                "{% load card_tags %}{% post_card post 'bogus' %}"
+                "{% endpost_card %}")
+
 
 class FollowTests(TestCase):
     @classmethod
@@ -268,3 +521,78 @@ class FollowTests(TestCase):
         follow_exist = Follow.objects.filter(user=author_user,
                                              author=author_user).exists()
         self.assertFalse(follow_exist)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='cond-group')
+        cls.post = Post.objects.create(
+            author=cls.author, text='Пост', group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_not_modified_before_rendering(self):
+        """Повторный запрос с валидаторами получает 304 без шаблона."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:post_detail', args=(self.post.pk,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn('public', response['Cache-Control'])
+                self.assertIn('Cookie', response['Vary'])
+                for header, value in (
+                        ('HTTP_IF_NONE_MATCH', response['ETag']),
+                        ('HTTP_IF_MODIFIED_SINCE',
+                         response['Last-Modified'])):
+                    cached = self.client.get(url, **{header: value})
+                    self.assertEqual(cached.status_code, 304)
+                    self.assertFalse(cached.templates)
+
+    def test_cached_feed_validated_without_queries(self):
+        url = reverse('posts:group_list', args=(self.group.slug,))
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_post_changes_validators(self):
+        url = reverse('posts:group_list', args=(self.group.slug,))
+        response = self.client.get(url)
+        Post.objects.create(author=self.author, text='Новый', group=self.group)
+        fresh = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(fresh.status_code, 200)
+        self.assertNotEqual(fresh['ETag'], response['ETag'])
+
+    def test_new_comment_changes_last_modified(self):
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        response = self.client.get(url)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий')
+        fresh = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+            HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(fresh.status_code, 200)
+        self.assertContains(fresh, 'Комментарий')
+
+    def test_user_variant_is_private(self):
+        """Страница пользователя не отдаётся по ETag гостя и меняется
+        после подписки."""
+        url = reverse('posts:profile', args=(self.author.username,))
+        guest_etag = self.client.get(url)['ETag']
+        self.client.force_login(self.reader)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=guest_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+        self.client.get(
+            reverse('posts:profile_follow', args=(self.author.username,)))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['following'])
@@ -0,0 +1,301 @@
+import csv
+import json
+import os
+from contextlib import contextmanager
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Записи идут в этом порядке, чтобы при импорте ссылки уже были
+# в базе. Пользователи передаются по username.
+GROUP = 'group'
+POST = 'post'
+COMMENT = 'comment'
+FOLLOW = 'follow'
+TYPES = (GROUP, POST, COMMENT, FOLLOW)
+
+CSV_FIELDS = (
+    'type', 'id', 'title', 'slug', 'description', 'text', 'pub_date',
+    'created', 'author', 'group', 'post', 'image', 'user',
+)
+
+# (модель, поля values(), имена полей в записи)
+EXPORT_FIELDS = {
+    GROUP: (Group, ('id', 'title', 'slug', 'description'),
+            ('id', 'title', 'slug', 'description')),
+    POST: (Post, ('id', 'text', 'pub_date', 'author__username', 'group_id',
+                  'image'),
+           ('id', 'text', 'pub_date', 'author', 'group', 'image')),
+    COMMENT: (Comment, ('id', 'post_id', 'author__username', 'text',
+                        'created'),
+              ('id', 'post', 'author', 'text', 'created')),
+    FOLLOW: (Follow, ('id', 'user__username', 'author__username'),
+             ('id', 'user', 'author')),
+}
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def iter_records(types=TYPES, after=None, chunk_size=2000):
+    """Записи для экспорта, потоково через iterator(chunk_size).
+
+    after=(type, id) продолжает прерванный экспорт: пропускаются
+    предыдущие типы и записи этого типа с id не больше заданного.
+    """
+    skip_type, skip_id = after or (None, None)
+    for record_type in TYPES:
+        if record_type not in types:
+            continue
+        if skip_type is not None and (
+                TYPES.index(record_type) < TYPES.index(skip_type)):
+            continue
+        model, columns, names = EXPORT_FIELDS[record_type]
+        queryset = model.objects.order_by('pk')
+        if record_type == skip_type:
+            queryset = queryset.filter(pk__gt=skip_id)
+        for row in queryset.values_list(*columns).iterator(
+                chunk_size=chunk_size):
+            record = {'type': record_type}
+            for name, value in zip(names, row):
+                if hasattr(value, 'isoformat'):
+                    value = value.isoformat()
+                record[name] = value
+            yield record
+
+
+class NdjsonWriter:
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, record):
+        self.stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+class CsvWriter:
+    def __init__(self, stream, header=True):
+        self.writer = csv.DictWriter(
+            stream, CSV_FIELDS, extrasaction='ignore')
+        if header:
+            self.writer.writeheader()
+
+    def write(self, record):
+        self.writer.writerow(record)
+
+
+def read_ndjson(stream):
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_csv(stream):
+    for row in csv.DictReader(stream):
+        yield {key: value for key, value in row.items() if value != ''}
+
+
+def ndjson_tail(source):
+    """Конец последней полной строки NDJSON и её запись.
+
+    Каждая запись — одна строка (json.dumps экранирует переводы
+    строк), поэтому хватает читать файл с конца.
+    """
+    source.seek(0, os.SEEK_END)
+    position = source.tell()
+    tail = b''
+    while position > 0 and tail.count(b'\n') < 2:
+        step = min(4096, position)
+        position -= step
+        source.seek(position)
+        tail = source.read(step) + tail
+    end = tail.rfind(b'\n')
+    if end == -1:
+        return 0, None
+    start = tail.rfind(b'\n', 0, end) + 1
+    return position + end + 1, json.loads(tail[start:end])
+
+
+def csv_tail(source):
+    """Конец последней полной строки CSV и её запись.
+
+    В тексте постов бывают переводы строк, поэтому граница записи
+    ищется csv-ридером с начала файла. Запись без завершающего
+    перевода строки или с неполным набором полей считается оборванной.
+    """
+    state = {'consumed': 0, 'newline': True}
+
+    def lines():
+        for line in source:
+            state['consumed'] += len(line)
+            state['newline'] = line.endswith(b'\n')
+            yield line.decode('utf-8')
+
+    offset, record = 0, None
+    try:
+        for row in csv.reader(lines()):
+            if not state['newline'] or len(row) != len(CSV_FIELDS):
+                break
+            offset = state['consumed']
+            if row != list(CSV_FIELDS):
+                record = dict(zip(CSV_FIELDS, row))
+    except csv.Error:
+        pass
+    return offset, record
+
+
+def resume_point(path, file_format):
+    """Точка продолжения экспорта: (тип, id) последней полной записи.
+
+    Оборванная запись в конце файла отрезается, чтобы дописывать его
+    с границы записи. None — полных записей в файле нет.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r+b') as source:
+        if file_format == 'csv':
+            offset, record = csv_tail(source)
+        else:
+            offset, record = ndjson_tail(source)
+        source.truncate(offset)
+    if record is None:
+        return None
+    return record['type'], int(record['id'])
+
+
+@contextmanager
+def keep_timestamps():
+    """Отключает auto_now_add, чтобы импорт сохранил исходные даты."""
+    fields = [Post._meta.get_field('pub_date'),
+              Comment._meta.get_field('created')]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def resolve_users(usernames):
+    """id пользователей по username; недостающие создаются без пароля."""
+    usernames = set(usernames)
+    found = dict(User.objects.filter(username__in=usernames).values_list(
+        'username', 'pk'))
+    missing = usernames - set(found)
+    if missing:
+        User.objects.bulk_create(
+            [User(username=name, password='!') for name in missing],
+            ignore_conflicts=True)
+        found.update(User.objects.filter(username__in=missing).values_list(
+            'username', 'pk'))
+    return found
+
+
+def as_int(value):
+    return int(value) if value not in (None, '') else None
+
+
+def build_objects(record_type, records):
+    """Объекты моделей из пачки записей одного типа."""
+    if record_type == GROUP:
+        return [
+            Group(id=as_int(record['id']), title=record['title'],
+                  slug=record['slug'],
+                  description=record.get('description'))
+            for record in records
+        ]
+    usernames = set()
+    for record in records:
+        usernames.update(
+            record[key] for key in ('author', 'user') if record.get(key))
+    users = resolve_users(usernames)
+    if record_type == POST:
+        return [
+            Post(id=as_int(record['id']), text=record['text'],
+                 pub_date=parse_datetime(record['pub_date']),
+                 author_id=users[record['author']],
+                 group_id=as_int(record.get('group')),
+                 image=record.get('image') or '')
+            for record in records
+        ]
+    if record_type == COMMENT:
+        return [
+            Comment(id=as_int(record['id']), text=record['text'],
+                    created=parse_datetime(record['created']),
+                    post_id=as_int(record['post']),
+                    author_id=users[record['author']])
+            for record in records
+        ]
+    return [
+        Follow(id=as_int(record['id']), user_id=users[record['user']],
+               author_id=users[record['author']])
+        for record in records
+    ]
+
+
+def occupied_types():
+    """Типы записей, строки которых уже есть в базе.
+
+    Импорт сохраняет id из файла, поэтому такие строки столкнулись бы
+    с загружаемыми.
+    """
+    return [
+        record_type for record_type in TYPES
+        if EXPORT_FIELDS[record_type][0].objects.exists()
+    ]
+
+
+def import_records(records, batch_size=5000, skip=0, on_batch=None):
+    """Пишет записи пачками bulk_create, каждая пачка — в своей транзакции.
+
+    id всех записей сохраняются, поэтому загружать можно только в
+    пустую базу (см. occupied_types). Конфликты по ключам
+    пропускаются, чтобы повтор недокоммиченной пачки при продолжении
+    был безопасен.
+    skip — сколько записей уже импортировано в прошлый раз; on_batch
+    вызывается после коммита каждой пачки с числом обработанных
+    записей и типом. Возвращает число обработанных записей.
+    """
+    processed = skip
+    records = islice(records, skip, None)
+    with keep_timestamps():
+        for batch in batched(records, batch_size):
+            with transaction.atomic():
+                for record_type in TYPES:
+                    chunk = [
+                        record for record in batch
+                        if record['type'] == record_type
+                    ]
+                    if not chunk:
+                        continue
+                    model = EXPORT_FIELDS[record_type][0]
+                    model.objects.bulk_create(
+                        build_objects(record_type, chunk),
+                        ignore_conflicts=True)
+            processed += len(batch)
+            if on_batch is not None:
+                on_batch(processed, batch[-1]['type'])
+    return processed
+
+
+def reset_sequences():
+    """Сдвигает счётчики id после вставки с явными id (не SQLite)."""
+    statements = connection.ops.sequence_reset_sql(
+        no_style(), [Group, Post, Comment, Follow])
+    if statements:
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
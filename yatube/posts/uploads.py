@@ -0,0 +1,72 @@
+import os
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+from django.conf import settings
+from django.core.files.uploadedfile import (InMemoryUploadedFile,
+                                            UploadedFile)
+from django.core.files.uploadhandler import FileUploadHandler
+
+# Форматы, в которых сохраняется уменьшенный оригинал.
+KEEP_FORMATS = {'JPEG', 'PNG', 'WEBP'}
+
+
+class OversizedUploadedFile(UploadedFile):
+    """Заглушка вместо файла, превысившего лимит размера.
+
+    Содержимое не хранится, известен только размер полученных данных.
+    """
+
+    def __init__(self, name, content_type, size):
+        super().__init__(BytesIO(), name, content_type, size)
+
+
+class SizeLimitUploadHandler(FileUploadHandler):
+    """Обрывает приём файла, как только он превышает лимит.
+
+    Стоит первым в FILE_UPLOAD_HANDLERS: пока лимит не превышен, куски
+    передаются дальше (в память или во временный файл на диске), после —
+    отбрасываются, а вместо файла форма получает OversizedUploadedFile.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.oversized = False
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.POST_IMAGE_MAX_UPLOAD_SIZE:
+            self.oversized = True
+        if self.oversized:
+            return None
+        return raw_data
+
+    def file_complete(self, file_size):
+        if not self.oversized:
+            return None
+        return OversizedUploadedFile(
+            self.file_name, self.content_type, self.received)
+
+
+def downscale_image(file, max_side):
+    """Уменьшает картинку так, чтобы большая сторона не превышала max_side.
+
+    draft() просит JPEG-декодер сразу распаковать картинку в уменьшенном
+    масштабе, поэтому полный растр оригинала в память не попадает.
+    Результат ограничен max_side и держится в памяти.
+    """
+    image = Image.open(file)
+    image_format = image.format if image.format in KEEP_FORMATS else 'PNG'
+    image.draft('RGB', (max_side, max_side))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, image_format, quality=90)
+    stem = os.path.splitext(os.path.basename(file.name))[0]
+    return InMemoryUploadedFile(
+        buffer, 'image', f'{stem}.{image_format.lower()}',
+        Image.MIME[image_format], buffer.tell(), None)
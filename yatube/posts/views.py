@@ -1,36 +1,119 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
-from django.views.decorators.cache import cache_page
-from django.conf import settings
+from django.db.models import Count, Max
 
+from core.routers import replica_reads
+
+from .caching import (INDEX_FEED, author_feed, cache_feed, conditional_page,
+                      feed_state, get_feed_version, group_feed)
+from .counters import ALL_POSTS, author_key, get_count, group_key
+from .feeds import FollowFeedPaginator
 from .forms import PostForm, CommentForm
 from .models import Post, Group, User, Follow
+from .paginators import CursorPaginator, WindowPaginator
+from .search import search_ids
 
 COUNT_POSTS = 10
+COUNT_COMMENTS = 20
 
 
-def get_paginator_obj(request, posts):
-    paginator = Paginator(posts, COUNT_POSTS)
+def get_paginator_obj(request, posts, cursor=False, count_key=None):
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    if after or before or (cursor and 'page' not in request.GET):
+        paginator = CursorPaginator(posts, COUNT_POSTS)
+        return paginator.get_cursor_page(after=after, before=before)
+    count = get_count(count_key, posts) if count_key else None
+    paginator = WindowPaginator(posts, COUNT_POSTS, count=count)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
 
 
-@cache_page(settings.TIME_CACHE)
+def get_index_posts():
+    return Post.objects.select_related(
+        'author', 'group').prefetch_related('image_variants')
+
+
+def get_group_posts(group):
+    return group.posts.select_related('author').prefetch_related(
+        'image_variants')
+
+
+def get_profile_posts(author):
+    return author.posts.select_related('group').prefetch_related(
+        'image_variants')
+
+
+def get_follow_paginator(user, per_page=COUNT_POSTS):
+    return FollowFeedPaginator(get_index_posts(), per_page, user=user)
+
+
+def latest_pub_date(posts):
+    return posts.order_by('-pub_date').values_list(
+        'pub_date', flat=True).first()
+
+
+def index_state(request):
+    return feed_state(
+        INDEX_FEED, 'latest', lambda: latest_pub_date(Post.objects.all()))
+
+
+def group_state(request, slug):
+    return feed_state(
+        group_feed(slug), 'latest',
+        lambda: latest_pub_date(Post.objects.filter(group__slug=slug)))
+
+
+def profile_state(request, username):
+    latest, version = feed_state(
+        author_feed(username), 'latest',
+        lambda: latest_pub_date(
+            Post.objects.filter(author__username=username)))
+    following = request.user.is_authenticated and Follow.objects.filter(
+        user=request.user, author__username=username).exists()
+    return latest, f'{version}:{following}'
+
+
+def post_state(request, post_id):
+    """Дата поста или его последнего комментария, число комментариев
+    и поколения лент автора и группы (правка поста их сдвигает).
+    """
+    row = Post.objects.filter(pk=post_id).order_by().annotate(
+        last_comment=Max('comments__created'),
+        comments_count=Count('comments'),
+    ).values_list('pub_date', 'last_comment', 'comments_count',
+                  'author__username', 'group__slug').first()
+    if row is None:
+        return None, None
+    pub_date, last_comment, comments_count, username, slug = row
+    feeds = [author_feed(username)]
+    if slug:
+        feeds.append(group_feed(slug))
+    return (max(pub_date, last_comment or pub_date),
+            f'{comments_count}:{get_feed_version(*feeds)}')
+
+
+@replica_reads
+@conditional_page(index_state)
+@cache_feed(lambda: INDEX_FEED)
 def index(request):
-    post_list = Post.objects.select_related('author', 'group')
-    page_obj = get_paginator_obj(request, post_list)
+    page_obj = get_paginator_obj(
+        request, get_index_posts(), cursor=True, count_key=ALL_POSTS)
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/index.html', context)
 
 
+@replica_reads
+@conditional_page(group_state)
+@cache_feed(group_feed)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related('author')
-    page_obj = get_paginator_obj(request, posts)
+    page_obj = get_paginator_obj(
+        request, get_group_posts(group), cursor=True,
+        count_key=group_key(group.pk))
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -38,27 +121,43 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@replica_reads
+@conditional_page(profile_state)
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    post_list = author.posts.select_related('group')
-    page_obj = get_paginator_obj(request, post_list)
+    post_list = get_profile_posts(author)
+    posts_count = get_count(author_key(author.pk), author.posts)
+    page_obj = get_paginator_obj(
+        request, post_list, cursor=True, count_key=author_key(author.pk))
     following = request.user.is_authenticated and (
         Follow.objects.filter(
             user=request.user, author=author).exists())
     context = {
         'author': author,
+        'posts_count': posts_count,
         'page_obj': page_obj,
         'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@replica_reads
+@conditional_page(post_state)
 def post_detail(request, post_id):
-    user_post = get_object_or_404(Post, id=post_id)
+    user_post = get_object_or_404(
+        Post.objects.select_related('author', 'group').prefetch_related(
+            'image_variants'),
+        id=post_id)
     form = CommentForm(request.POST or None)
-    comments = user_post.comments.all()
+    comments = WindowPaginator(
+        user_post.comments.select_related('author'), COUNT_COMMENTS
+    ).get_page(request.GET.get('page'))
+    author_posts_count = get_count(
+        author_key(user_post.author_id),
+        Post.objects.filter(author_id=user_post.author_id))
     context = {
         'user_post': user_post,
+        'author_posts_count': author_posts_count,
         'form': form,
         'comments': comments,
     }
@@ -67,7 +166,7 @@ def post_detail(request, post_id):
 
 @login_required
 def post_create(request):
-    form = PostForm(request.POST or None)
+    form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
         create_post = form.save(commit=False)
         create_post.author = request.user
@@ -89,7 +188,11 @@ def post_edit(request, post_id):
     if request.user != select_post.author:
         return redirect('posts:post_detail', post_id=post_id)
 
-    form = PostForm(request.POST or None, instance=select_post)
+    form = PostForm(
+        request.POST or None,
+        files=request.FILES or None,
+        instance=select_post,
+    )
     if form.is_valid():
         form.save()
         return redirect('posts:post_detail', post_id)
@@ -116,15 +219,39 @@ def add_comment(request, post_id):
 
 
 @login_required
+@replica_reads
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = get_paginator_obj(request, post_list)
+    paginator = get_follow_paginator(request.user)
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    if after or before:
+        page_obj = paginator.get_cursor_page(after=after, before=before)
+    else:
+        page_obj = paginator.get_first_page()
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/follow.html', context)
 
 
+@replica_reads
+def search(request):
+    query = request.GET.get('q', '').strip()
+    ids = search_ids(query) if query else []
+    page_obj = WindowPaginator(ids, COUNT_POSTS).get_page(
+        request.GET.get('page'))
+    posts = Post.objects.select_related('author', 'group').prefetch_related(
+        'image_variants').in_bulk(page_obj.object_list)
+    page_obj.object_list = [
+        posts[pk] for pk in page_obj.object_list if pk in posts
+    ]
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def profile_follow(request, username):
     user = get_object_or_404(User, username=username)
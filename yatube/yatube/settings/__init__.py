@@ -0,0 +1,18 @@
+"""Настройки проекта.
+
+Профиль выбирается переменной окружения DJANGO_ENV: dev (по
+умолчанию) — с отладкой и debug toolbar, prod — для боевого сервера.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+ENVIRONMENT = os.getenv('DJANGO_ENV', 'dev')
+
+if ENVIRONMENT == 'dev':
+    from .dev import *
+elif ENVIRONMENT == 'prod':
+    from .prod import *
+else:
+    raise ImproperlyConfigured(
+        f'Неизвестный DJANGO_ENV={ENVIRONMENT!r}, ожидается dev или prod')
@@ -0,0 +1,272 @@
+"""Общие настройки всех профилей; профиль выбирается в __init__.py."""
+import os
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+
+SECRET_KEY = 'wz=ex_g*5u832*nhxpcqa6^+as59aam5ruwfc1y_$8h4=7kxn4'
+
+
+DEBUG = False
+
+ALLOWED_HOSTS = [
+    'www.Artem02071993.pythonanywhere.com',
+    'Artem02071993.pythonanywhere.com',
+    'localhost',
+    '127.0.0.1',
+    '[::1]',
+    'testserver',
+]
+
+
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'posts.apps.PostsConfig',
+    'users.apps.UsersConfig',
+    'core.apps.CoreConfig',
+    'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
+    'sorl.thumbnail',
+]
+
+MIDDLEWARE = [
+    'core.middleware.ProfilingMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.PrimaryPinMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'yatube.urls'
+
+TEMPLATES = [
+    {
+        'BACKEND': 'core.profiling.ProfilingTemplates',
+        'DIRS': [os.path.join(BASE_DIR, 'templates')],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+                'core.context_processors.year.year',
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'yatube.wsgi.application'
+
+# Компилировать шаблоны проекта при старте WSGI-воркера (core.warmup);
+# действует там, где включён cached-загрузчик шаблонов.
+TEMPLATE_WARMUP = True
+
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+    }
+}
+
+# Реплики только для чтения: алиасы DATABASES, на которые
+# core.routers.ReplicaRouter отправляет чтения лент. Локально реплику
+# заменяет копия базы по пути DB_REPLICA_PATH (manage.py sync_replica).
+DATABASE_REPLICAS = []
+
+if os.getenv('DB_REPLICA_PATH'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.getenv('DB_REPLICA_PATH'),
+        'CONN_MAX_AGE': DATABASES['default']['CONN_MAX_AGE'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append('replica')
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Сколько секунд после записи пользователь читает с основной базы.
+REPLICA_PIN_SECONDS = 10
+
+# Применяются к каждому новому соединению с SQLite (core.db).
+# WAL не даёт писателям блокировать читателей, synchronous=NORMAL
+# в режиме WAL теряет при сбое питания только последние транзакции,
+# но не портит базу. cache_size в минус-килобайтах.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -20000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+
+LANGUAGE_CODE = 'ru'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = True
+
+
+STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+STATIC_URL = '/static/'
+
+POSTS_SHOWN = 10
+
+LOGIN_URL = 'users:login'
+LOGIN_REDIRECT_URL = 'posts:index'
+EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+
+COUNT_WORD = 15
+
+POSTS_CHIK = 10
+
+CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+DEFAULT_FILE_STORAGE = 'posts.storage.ContentAddressedStorage'
+
+# Каталоги MEDIA_ROOT, которые чистит collect_media; cache — бывший
+# кэш миниатюр sorl-thumbnail.
+MEDIA_GC_DIRS = ('posts', 'cache')
+
+# Файлы моложе этого возраста (в секундах) сборщик не трогает:
+# загрузка могла ещё не дойти до записи в базе.
+MEDIA_GC_GRACE = 60 * 60
+
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Каждое поколение ленты оставляет свои страницы, состояния и
+    # карточки до истечения срока, поэтому стандартных 300 записей
+    # не хватает: кэш вычищался бы почти при каждом set. При
+    # переполнении удаляется 1/CULL_FREQUENCY записей.
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 50000)),
+            'CULL_FREQUENCY': 4,
+        },
+    },
+    'memcached': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': os.getenv('CACHE_LOCATION', 'unix:/tmp/memcached.sock'),
+    },
+}
+
+CACHES = {
+    'default': CACHE_BACKENDS[os.getenv('CACHE_BACKEND', 'locmem')],
+}
+
+CACHE_LOCK_TIMEOUT = 10
+
+CACHE_EARLY_REFRESH_BETA = 1.0
+
+# Срок страниц лент при общем кэше (file, memcached) и при
+# LocMemCache, где поколения лент у каждого воркера свои.
+TIME_CACHE = 60 * 5
+
+TIME_CACHE_LOCAL = 20
+
+# Сколько живёт закэшированная карточка поста (тег post_card).
+POST_CARD_TIMEOUT = 60 * 10
+
+FEED_FANOUT_LIMIT = 1000
+
+FEED_CELEBRITIES_TIMEOUT = 300
+
+FEED_BATCH_SIZE = 1000
+
+API_MAX_LIMIT = 100
+
+# Доля запросов, которые профилирует core.middleware.ProfilingMiddleware.
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0.1'))
+
+# Границы корзин гистограмм времени, секунды.
+PROFILING_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+# Сколько последних замеров вьюхи идёт в перцентили.
+PROFILING_WINDOW = 1000
+
+# Адреса, которым доступен /metrics/; пустой список — всем.
+PROFILING_METRICS_IPS = ['127.0.0.1']
+
+# Запросы дольше порога пишутся в журнал core.slowlog.
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', '100'))
+
+# JSON Lines для команды slow_queries; пустая строка — только logging.
+SLOW_QUERY_LOG = os.getenv(
+    'SLOW_QUERY_LOG', os.path.join(BASE_DIR, 'slow_queries.log'))
+
+POST_IMAGE_WORKERS = 2
+
+POST_IMAGE_WIDTHS = (480, 960, 1440)
+
+POST_IMAGE_RATIO = (960, 339)
+
+POST_IMAGE_QUALITY = 80
+
+# Картинку без вариантов при показе ставят в очередь не чаще, чем
+# раз в столько секунд.
+POST_IMAGE_RETRY_TIMEOUT = 60 * 10
+
+# Сколько секунд файл, найденный при загрузке того же содержимого,
+# не удаляется, пока в базу не запишется ссылка на него.
+POST_IMAGE_CLAIM_TIMEOUT = 60
+
+# Загрузки крупнее 1 МБ пишутся кусками во временный файл на диске.
+FILE_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024
+
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploads.SizeLimitUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+POST_IMAGE_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+
+POST_IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+
+POST_IMAGE_MAX_SIDE = 2560
@@ -0,0 +1,58 @@
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *
+
+DEBUG = False
+
+SECRET_KEY = os.getenv('SECRET_KEY')
+if not SECRET_KEY:
+    raise ImproperlyConfigured('Для DJANGO_ENV=prod задайте SECRET_KEY')
+
+if os.getenv('ALLOWED_HOSTS'):
+    ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS').split(',')
+
+# Сжатие до остальных middleware, которые читают тело ответа;
+# ConditionalGet — после GZip, чтобы ETag считался по несжатому телу.
+MIDDLEWARE = list(MIDDLEWARE)
+MIDDLEWARE.insert(
+    MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,
+    'django.middleware.gzip.GZipMiddleware')
+MIDDLEWARE.insert(
+    MIDDLEWARE.index(
+        'django.contrib.sessions.middleware.SessionMiddleware') + 1,
+    'django.middleware.http.ConditionalGetMiddleware')
+
+# Шаблоны разбираются один раз на процесс.
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    },
+}]
+
+STATIC_ROOT = os.getenv('STATIC_ROOT', os.path.join(BASE_DIR, 'staticfiles'))
+
+STATICFILES_STORAGE = os.getenv(
+    'STATICFILES_STORAGE',
+    'django.contrib.staticfiles.storage.ManifestStaticFilesStorage')
+
+# Соединения с базой живут между запросами.
+for database in DATABASES.values():
+    database['CONN_MAX_AGE'] = int(os.getenv('DB_CONN_MAX_AGE', 600))
+
+# Воркеры делят один кэш, иначе поколения лент и блокировки от
+# наплыва у каждого процесса свои.
+CACHES = {
+    'default': CACHE_BACKENDS[os.getenv('CACHE_BACKEND', 'file')],
+}
+
+SESSION_COOKIE_SECURE = True
+
+CSRF_COOKIE_SECURE = True